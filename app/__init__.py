@@ -1,19 +1,66 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_restful import Api
+from app.alerts import LowStockMonitor
+from app.counters import OrderStatusCounters
+from app.database import configure_engine, install_sqlite_pragmas
+from app.events import OrderEventBroker
+from app.idempotency import IdempotencyStore
+from app.ledger import StockLedger
+from app.menu_cache import MenuCache
+from app.metrics import RequestMetrics
+from app.passwords import PasswordHasher
+from app.reports import SalesRollups
 
 db = SQLAlchemy()
-migrate = Migrate()
+menu_cache = MenuCache()
+request_metrics = RequestMetrics()
+stock_ledger = StockLedger()
+low_stock_monitor = LowStockMonitor()
+order_events = OrderEventBroker()
+sales_rollups = SalesRollups()
+order_counters = OrderStatusCounters()
+password_hasher = PasswordHasher()
+idempotency_keys = IdempotencyStore()
 
-def create_app():
+# 'full' also sets up Flask-Migrate for the `flask db` commands; 'runtime' serves
+# requests only and never imports Alembic, which dominates the import time
+APP_PROFILES = ('full', 'runtime')
+
+def create_app(config=None):
     app = Flask(__name__)
     # 使用 SQLite 作為開發資料庫
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///breakfast.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['BULK_ORDER_MAX_ORDERS'] = 500
+    app.config['BULK_ORDER_CHUNK_SIZE'] = None # None commits a whole batch in one transaction
+    app.config['ORDER_MAX_LINES'] = 50 # Lines per order, checked before any query runs
+    app.config['ORDER_MAX_QUANTITY'] = 100 # Per menu item, after duplicate lines are merged
+    app.config['ORDER_EXPORT_CHUNK_SIZE'] = 1000 # Orders read per query by the admin export
+    # Deployment settings come from BREAKFAST_* environment variables,
+    # e.g. BREAKFAST_SQLALCHEMY_DATABASE_URI or BREAKFAST_DB_ENGINE_PROFILE=production
+    app.config.from_prefixed_env('BREAKFAST')
+    if config:
+        # Overrides must be applied before the extensions read the config
+        app.config.update(config)
+    if app.config.setdefault('APP_PROFILE', 'full') not in APP_PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE '{app.config['APP_PROFILE']}'. Expected one of: {', '.join(APP_PROFILES)}")
+    configure_engine(app)
     
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        install_sqlite_pragmas(app, db.engine)
+    if app.config['APP_PROFILE'] == 'full':
+        init_migrations(app)
+    menu_cache.init_app(app)
+    request_metrics.init_app(app)
+    stock_ledger.init_app(app)
+    low_stock_monitor.init_app(app)
+    order_events.init_app(app)
+    sales_rollups.init_app(app)
+    order_counters.init_app(app)
+    password_hasher.init_app(app)
+    idempotency_keys.init_app(app)
     
     from app import models  # Import models here to register them with SQLAlchemy and Flask-Migrate
     
@@ -23,3 +70,7 @@ def create_app():
     
     return app
 
+def init_migrations(app):
+    """Register Flask-Migrate on ``app``; only the ``full`` profile needs it."""
+    from flask_migrate import Migrate
+    Migrate(app, db)
@@ -0,0 +1,98 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+from app.txn import on_commit
+
+class _MonitorState:
+    def __init__(self, sink, default_threshold):
+        self.sink = sink
+        self.default_threshold = default_threshold
+
+class LowStockMonitor:
+    """Edge-triggered restock warnings, stored in the ``low_stock_alert`` table.
+
+    ``observe`` is called with an item's stock before and after each change,
+    as returned by the stock ``UPDATE`` itself. Only a change that takes the
+    item below its threshold records an alert, in the same transaction, so
+    each crossing is alerted exactly once however many worker processes
+    serve orders, and an item that stays below its threshold raises nothing
+    new until it is restocked past it. ``LOW_STOCK_ALERT_SINK`` may name an
+    object with ``emit(alert)`` that additionally receives every alert once
+    it is committed, e.g. to forward it elsewhere.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOW_STOCK_THRESHOLD', 10)
+        app.config.setdefault('LOW_STOCK_ALERT_SINK', None)
+        app.extensions['low_stock_monitor'] = _MonitorState(app.config['LOW_STOCK_ALERT_SINK'], app.config['LOW_STOCK_THRESHOLD'])
+        _register_mapper_listeners()
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['low_stock_monitor']
+
+    def observe(self, session, menu_item_id, name, before, after, threshold=None):
+        _observe(self._state(), session, session, menu_item_id, name, before, after, threshold)
+
+    def recent(self, limit=None):
+        """Return the most recent alerts, newest first."""
+        from app import db
+        from app.models import LowStockAlert
+        query = db.select(LowStockAlert).order_by(LowStockAlert.id.desc())
+        if limit:
+            query = query.limit(limit)
+        return [_as_dict(alert) for alert in db.session.execute(query).scalars()]
+
+def _observe(state, session, connection, menu_item_id, name, before, after, threshold):
+    # ``connection`` runs the INSERT: the session itself, or the flush's connection inside mapper events
+    from app.models import LowStockAlert
+    if threshold is None:
+        threshold = state.default_threshold
+    if not after < threshold <= before:
+        return
+    alert = {
+        'menu_item_id': menu_item_id,
+        'name': name,
+        'stock': after,
+        'threshold': threshold,
+        'message': f'Low stock for {name}: {after} left (threshold {threshold}). Please restock.',
+        'created_at': datetime.utcnow(),
+    }
+    alert['id'] = connection.execute(LowStockAlert.__table__.insert().values(**alert)).inserted_primary_key[0]
+    if state.sink is not None:
+        sink = state.sink
+        on_commit(session, lambda: sink.emit({**alert, 'created_at': alert['created_at'].isoformat()}))
+
+def _as_dict(alert):
+    return {
+        'id': alert.id,
+        'menu_item_id': alert.menu_item_id,
+        'name': alert.name,
+        'stock': alert.stock,
+        'threshold': alert.threshold,
+        'message': alert.message,
+        'created_at': alert.created_at.isoformat(),
+    }
+
+_listeners_registered = False
+
+def _register_mapper_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    _listeners_registered = True
+    from app.models import MenuItem
+
+    # Stock edited through the ORM (e.g. a restock) can cross a threshold as well
+    @event.listens_for(MenuItem, 'after_update')
+    def _observe_stock_update(mapper, connection, target):
+        history = inspect(target).attrs.stock.history
+        session = object_session(target)
+        if history.deleted and history.added and session is not None and 'low_stock_monitor' in current_app.extensions:
+            _observe(current_app.extensions['low_stock_monitor'], session, connection, target.id, target.name,
+                     history.deleted[0] or 0, history.added[0] or 0, target.low_stock_threshold)
@@ -1,9 +1,16 @@
 from flask_restful import Api
 
 def init_app(api: Api):
-    from .admin import AdminOrdersResource, OrderStatusResource
-    from .customer import OrderCreationResource, MenuResource
+    from .admin import AdminOrdersResource, AdminOrdersExportResource, AdminOrderEventsResource, OrderStatusResource, LowStockAlertsResource, AdminDashboardResource, SalesReportResource
+    from .customer import OrderCreationResource, OrderBatchResource, OrderEventsResource, MenuResource
     api.add_resource(AdminOrdersResource, '/api/v1/admin/orders')
+    api.add_resource(AdminOrdersExportResource, '/api/v1/admin/orders/export')
+    api.add_resource(AdminOrderEventsResource, '/api/v1/admin/orders/events')
+    api.add_resource(LowStockAlertsResource, '/api/v1/admin/alerts')
+    api.add_resource(AdminDashboardResource, '/api/v1/admin/dashboard')
+    api.add_resource(SalesReportResource, '/api/v1/admin/reports/sales')
     api.add_resource(OrderStatusResource, '/api/v1/orders/<int:order_id>/status')
     api.add_resource(OrderCreationResource, '/api/v1/orders')
+    api.add_resource(OrderEventsResource, '/api/v1/orders/<int:order_id>/events')
+    api.add_resource(OrderBatchResource, '/api/v1/orders/batch')
     api.add_resource(MenuResource, '/api/v1/menu')
\ No newline at end of file
@@ -1,67 +1,242 @@
-from flask import request
+from flask import current_app, request, stream_with_context
 from flask_restful import Resource
-from app import db
-from app.models import Order, User # Assuming User model is needed for filtering by user
+from app import db, low_stock_monitor, order_counters, order_events, sales_rollups
+from app.models import MenuItem, Order, OrderItem, User # Assuming User model is needed for filtering by user
+from app.services import ORDER_STATUS_TRANSITIONS, OrderService
 from datetime import datetime
+import base64
+import csv
+import io
+import json
+
+# Only the columns the order list returns: rows instead of ORM objects, so no
+# identity-map entries, no relationship loading and no User/password_hash data
+ORDER_LIST_COLUMNS = (Order.id, Order.user_id, Order.status, Order.total_amount, Order.item_count,
+                      Order.created_at, Order.updated_at)
+
+def order_list_query():
+    return db.session.query(*ORDER_LIST_COLUMNS)
+
+def load_order_items(order_ids):
+    # Load the items of every order on the page, with their menu item names, in a single query
+    items_by_order = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items_by_order
+    order_items = db.session.execute(
+        db.select(OrderItem.order_id, OrderItem.menu_item_id, OrderItem.quantity, OrderItem.price, MenuItem.name)
+        .join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.id)
+    )
+    for item in order_items:
+        items_by_order[item.order_id].append(item)
+    return items_by_order
+
+def apply_order_filters(query, args):
+    # Filters shared by every admin view of the order list
+    user_id = args.get('user_id', type=int)
+    status = args.get('status')
+    start_date = args.get('start_date') # YYYY-MM-DD
+    end_date = args.get('end_date')     # YYYY-MM-DD
+
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    if status:
+        query = query.filter_by(status=status)
+    if start_date:
+        query = query.filter(Order.created_at >= datetime.strptime(start_date, '%Y-%m-%d'))
+    if end_date:
+        # Add one day to include orders from the end_date
+        end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
+        query = query.filter(Order.created_at < end_date_obj + timedelta(days=1))
+    return query
+
+def serialize_orders(orders):
+    # Accepts order rows from order_list_query() as well as Order objects
+    # For simplicity, we'll return a basic dictionary. In a real app, use Marshmallow or similar.
+    items_by_order = load_order_items([order.id for order in orders])
+    result = []
+    for order in orders:
+        order_items_data = []
+        for item in items_by_order[order.id]:
+            order_items_data.append({
+                'item_id': item.menu_item_id,
+                'quantity': item.quantity,
+                'price_at_order': item.price,
+                'item_name': item.name # Joined in by load_order_items
+            })
+
+        result.append({
+            'id': order.id,
+            'user_id': order.user_id,
+            'status': order.status,
+            'total_amount': order.total_amount,
+            'item_count': order.item_count,
+            'created_at': order.created_at.isoformat(),
+            'updated_at': order.updated_at.isoformat(),
+            'items': order_items_data
+        })
+    return result
+
+def encode_cursor(order):
+    # Opaque keyset position: the (created_at, id) of the last order on the page
+    raw = f'{order.created_at.isoformat()}|{order.id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+def orders_after(query, created_at, order_id):
+    # Orders that come after (created_at, order_id) in newest-first order. The row-value
+    # comparison is what lets SQLite seek the created_at index; the equivalent
+    # OR/AND form scans it from the newest order on every page
+    return query.filter(db.tuple_(Order.created_at, Order.id) < (created_at, order_id))
+
+EXPORT_CSV_COLUMNS = ('order_id', 'user_id', 'status', 'total_amount', 'item_count', 'created_at', 'updated_at',
+                      'item_id', 'item_name', 'quantity', 'price_at_order')
+
+def export_chunks(query, chunk_size):
+    # Walk the filtered orders newest first with keyset chunks: each chunk is one
+    # index range scan plus one items query, and only one chunk is in memory at a time
+    query = query.order_by(Order.created_at.desc(), Order.id.desc())
+    chunk = query.limit(chunk_size).all()
+    while chunk:
+        yield serialize_orders(chunk)
+        last = chunk[-1]
+        db.session.close() # Do not hold a read transaction open between chunks
+        if len(chunk) < chunk_size:
+            break
+        chunk = orders_after(query, last.created_at, last.id).limit(chunk_size).all()
+
+def export_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    for orders in chunks:
+        for order in orders:
+            fields = [order['id'], order['user_id'], order['status'], order['total_amount'], order['item_count'],
+                      order['created_at'], order['updated_at']]
+            # One line per item; an order without items still gets a line
+            for item in order['items'] or [None]:
+                item_fields = [item['item_id'], item['item_name'], item['quantity'], item['price_at_order']] if item else [''] * 4
+                writer.writerow(fields + item_fields)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def export_ndjson(chunks):
+    for orders in chunks:
+        yield ''.join(json.dumps(order) + '\n' for order in orders)
 
 class AdminOrdersResource(Resource):
     def get(self):
-        query = Order.query
-
-        # Filtering
-        user_id = request.args.get('user_id', type=int)
-        status = request.args.get('status')
-        start_date = request.args.get('start_date') # YYYY-MM-DD
-        end_date = request.args.get('end_date')     # YYYY-MM-DD
-
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        if status:
-            query = query.filter_by(status=status)
-        if start_date:
-            query = query.filter(Order.created_at >= datetime.strptime(start_date, '%Y-%m-%d'))
-        if end_date:
-            # Add one day to include orders from the end_date
-            end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-            query = query.filter(Order.created_at < end_date_obj + timedelta(days=1))
+        query = apply_order_filters(order_list_query(), request.args)
+        per_page = request.args.get('per_page', 20, type=int)
+
+        if request.args.get('pagination') == 'cursor' or 'cursor' in request.args:
+            return self.get_by_cursor(query, per_page)
 
         # Pagination
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         
         orders = query.order_by(Order.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
 
-        # Serialize orders
-        # For simplicity, we'll return a basic dictionary. In a real app, use Marshmallow or similar.
-        result = []
-        for order in orders.items:
-            order_items_data = []
-            for item in order.items:
-                order_items_data.append({
-                    'item_id': item.menu_item_id,
-                    'quantity': item.quantity,
-                    'price_at_order': item.price,
-                    'item_name': item.menu_item.name # Assuming menu_item relationship is loaded
-                })
-
-            result.append({
-                'id': order.id,
-                'user_id': order.user_id,
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
-                'updated_at': order.updated_at.isoformat(),
-                'items': order_items_data
-            })
-        
         return {
-            'orders': result,
+            'orders': serialize_orders(orders.items),
             'total_pages': orders.pages,
             'current_page': orders.page,
             'total_items': orders.total
         }, 200
 
+    def get_by_cursor(self, query, per_page):
+        # Keyset pagination on (created_at, id): every page is an index range scan,
+        # so deep pages cost the same as the first one and no COUNT(*) is needed
+        filtered_query = query
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                created_at, order_id = decode_cursor(cursor)
+            except ValueError as e:
+                return {'message': str(e)}, 400
+            query = orders_after(query, created_at, order_id)
+
+        per_page = max(per_page, 1)
+        orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(per_page + 1).all()
+        has_more = len(orders) > per_page
+        orders = orders[:per_page]
+
+        response = {
+            'orders': serialize_orders(orders),
+            'per_page': per_page,
+            'next_cursor': encode_cursor(orders[-1]) if has_more else None
+        }
+        if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+            response['total_items'] = filtered_query.order_by(None).count()
+        return response, 200
+
 from datetime import timedelta # Import timedelta for end_date filtering
 
+class AdminOrdersExportResource(Resource):
+    FORMATS = {
+        'csv': (export_csv, 'text/csv'),
+        'ndjson': (export_ndjson, 'application/x-ndjson'),
+    }
+
+    def get(self):
+        export_format = request.args.get('format', 'csv')
+        if export_format not in self.FORMATS:
+            return {'message': f"Unsupported export format '{export_format}'. Use csv or ndjson."}, 400
+        try:
+            query = apply_order_filters(order_list_query(), request.args)
+        except ValueError:
+            return {'message': 'Dates must be formatted as YYYY-MM-DD'}, 400
+
+        chunk_size = max(current_app.config['ORDER_EXPORT_CHUNK_SIZE'], 1)
+        encode, mimetype = self.FORMATS[export_format]
+        body = stream_with_context(encode(export_chunks(query, chunk_size)))
+        response = current_app.response_class(body, mimetype=mimetype)
+        filename = f"orders-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class AdminOrderEventsResource(Resource):
+    def get(self):
+        # Live feed of every committed status transition
+        return order_events.response()
+
+class LowStockAlertsResource(Resource):
+    def get(self):
+        limit = request.args.get('limit', 50, type=int)
+        return {'alerts': low_stock_monitor.recent(limit)}, 200
+
+class AdminDashboardResource(Resource):
+    def get(self):
+        # Served from the status counters, never a COUNT over the order table
+        counts = order_counters.counts()
+        return {'order_counts': counts, 'total_orders': sum(counts.values())}, 200
+
+class SalesReportResource(Resource):
+    def get(self):
+        # Reads the sales rollups only; never aggregates the order tables
+        try:
+            end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+                if request.args.get('end_date') else datetime.utcnow().date()
+            start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+                if request.args.get('start_date') else end_date - timedelta(days=6)
+        except ValueError:
+            return {'message': 'Dates must be formatted as YYYY-MM-DD'}, 400
+        if start_date > end_date:
+            return {'message': 'start_date must not be after end_date'}, 400
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in ('day', 'hour'):
+            return {'message': "granularity must be 'day' or 'hour'"}, 400
+        top = min(max(request.args.get('top', 10, type=int), 1), 100)
+        return sales_rollups.report(start_date, end_date, granularity, top), 200
+
 class OrderStatusResource(Resource):
     def put(self, order_id):
         data = request.get_json()
@@ -70,24 +245,17 @@ class OrderStatusResource(Resource):
         if not new_status:
             return {'message': 'Status is required'}, 400
         
-        order = db.session.get(Order, order_id)
-        if not order:
-            return {'message': 'Order not found'}, 404
-        
-        # Basic status transition validation (can be more sophisticated with a state machine library)
-        valid_transitions = {
-            'pending': ['processing', 'cancelled'],
-            'processing': ['completed', 'cancelled'],
-            'completed': [], # Cannot change once completed
-            'cancelled': []  # Cannot change once cancelled
-        }
+        # One round trip: the conditional UPDATE either applies the transition or matches nothing
+        changed = OrderService.change_status(order_id, new_status)
+        if changed is None:
+            # Only failed changes pay for a second query, to explain why
+            status = db.session.execute(db.select(Order.status).where(Order.id == order_id)).scalar()
+            if status is None:
+                return {'message': 'Order not found'}, 404
+            if status == new_status:
+                return {'message': f'Order is already {status}. No change needed.'}, 200
+            if new_status not in ORDER_STATUS_TRANSITIONS.get(status, ()):
+                return {'message': f'Invalid status transition from {status} to {new_status}'}, 400
+            return {'message': f'Order {order_id} was changed by another request. Please retry.'}, 409
 
-        if new_status not in valid_transitions.get(order.status, []):
-            if new_status == order.status:
-                return {'message': f'Order is already {order.status}. No change needed.'}, 200
-            return {'message': f'Invalid status transition from {order.status} to {new_status}'}, 400
-        
-        order.status = new_status
-        db.session.commit()
-        
-        return {'message': f'Order {order.id} status updated to {new_status}'}, 200
\ No newline at end of file
+        return {'message': f'Order {order_id} status updated to {new_status}'}, 200
@@ -1,20 +1,28 @@
-from flask import request
+from flask import current_app, request
 from flask_restful import Resource
-from app.services import OrderService
-from app import db
-from app.models import User, MenuItem
+from app.services import OrderService, OrderValidationError
+from app import db, idempotency_keys, menu_cache, order_events
+from app.models import User, MenuItem, Order
 
 class OrderCreationResource(Resource):
     def post(self):
         data = request.get_json()
         user_id = data.get('user_id')
-        items_data = data.get('items')
 
-        if not user_id:
-            return {'message': 'User ID is required'}, 400
-        if not items_data or not isinstance(items_data, list):
-            return {'message': 'Items data (list of item_id and quantity) is required'}, 400
-        
+        # Reject malformed requests before touching the database, Idempotency-Key
+        # table included: the same body always fails the same way
+        try:
+            items_data = OrderService.validate_order(user_id, data.get('items'))
+        except OrderValidationError as e:
+            return {'message': str(e)}, 400
+
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return self.create_order(user_id, items_data)
+        # Retries with the same key get the first response back instead of a second order
+        return idempotency_keys.run(key, data, lambda: self.create_order(user_id, items_data))
+
+    def create_order(self, user_id, items_data):
         user = db.session.get(User, user_id)
         if not user:
             return {'message': f'User with ID {user_id} not found'}, 404
@@ -33,17 +41,54 @@ class OrderCreationResource(Resource):
             db.session.rollback() # Rollback in case of unexpected errors
             return {'message': f'An unexpected error occurred: {str(e)}'}, 500
 
+class OrderBatchResource(Resource):
+    def post(self):
+        data = request.get_json()
+        orders_data = data.get('orders') if isinstance(data, dict) else None
+        if not orders_data or not isinstance(orders_data, list):
+            return {'message': 'Orders data (list of orders) is required'}, 400
+        max_orders = current_app.config['BULK_ORDER_MAX_ORDERS']
+        if len(orders_data) > max_orders:
+            return {'message': f'A batch may contain at most {max_orders} orders'}, 400
+
+        chunk_size = data.get('chunk_size', current_app.config['BULK_ORDER_CHUNK_SIZE'])
+        if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size < 1):
+            return {'message': 'chunk_size must be a positive integer'}, 400
+
+        try:
+            results = OrderService.create_orders_bulk(orders_data, chunk_size=chunk_size)
+        except Exception as e:
+            db.session.rollback()
+            return {'message': f'An unexpected error occurred: {str(e)}'}, 500
+
+        created = sum(1 for result in results if result['success'])
+        return {
+            'message': f'{created} of {len(results)} orders created',
+            'created': created,
+            'failed': len(results) - created,
+            'results': results
+        }, 201 if created == len(results) else 207
+
+class OrderEventsResource(Resource):
+    def get(self, order_id):
+        # Status updates for the customer's order tracking page
+        if db.session.get(Order, order_id) is None:
+            return {'message': 'Order not found'}, 404
+        db.session.remove() # Do not hold a pooled connection for the lifetime of the stream
+        return order_events.response(order_id)
+
 class MenuResource(Resource):
     def get(self):
-        menu_items = MenuItem.query.all()
-        result = []
-        for item in menu_items:
-            result.append({
-                'id': item.id,
-                'name': item.name,
-                'description': item.description,
-                'price': item.price,
-                'stock': item.stock,
-                'image_url': item.image_url
-            })
-        return {'menu': result}, 200
+        etag, body = menu_cache.get_or_build(MenuResource.serialize_menu)
+        response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache' # Clients must revalidate, which costs a 304 at most
+        return response.make_conditional(request)
+
+    @staticmethod
+    def serialize_menu():
+        # Select just the published columns; each row maps straight onto the JSON object
+        menu_items = db.session.execute(db.select(
+            MenuItem.id, MenuItem.name, MenuItem.description, MenuItem.price, MenuItem.stock, MenuItem.image_url
+        ))
+        return [dict(item) for item in menu_items.mappings()]
@@ -0,0 +1,132 @@
+import threading
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.reports import _dialect_insert, check_upsert_support
+from app.txn import on_commit
+
+class _CounterState:
+    def __init__(self, ttl):
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        self.version = 0
+        self.entry = None # (version, loaded_at, counts)
+
+class OrderStatusCounters:
+    """Number of orders currently in each status, for the admin dashboard.
+
+    Order flows report status changes with ``record``, which adds them to the
+    ``order_status_count`` table in the same transaction, so reading the
+    counts costs one query over a handful of rows however many orders exist.
+    Reads are cached in process; a local commit that changed the counts
+    invalidates the cache at once, and ``ORDER_COUNTERS_CACHE_SECONDS``
+    bounds how long changes committed by other workers take to show up.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        check_upsert_support(app, 'Order status counters')
+        app.config.setdefault('ORDER_COUNTERS_CACHE_SECONDS', 1.0)
+        app.extensions['order_counters'] = _CounterState(app.config['ORDER_COUNTERS_CACHE_SECONDS'])
+        app.cli.add_command(counters_cli)
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['order_counters']
+
+    def record(self, session, deltas):
+        """Add ``deltas`` (``{status: change}``) to the counters in ``session``'s transaction."""
+        from app.models import OrderStatusCount
+        rows = [{'status': status, 'order_count': delta} for status, delta in deltas.items() if delta]
+        if not rows:
+            return
+        insert = _dialect_insert(session)
+        statement = insert(OrderStatusCount.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['status'],
+            set_={'order_count': OrderStatusCount.order_count + statement.excluded.order_count}
+        )
+        session.execute(statement, rows)
+        state = self._state()
+        on_commit(session, lambda: _invalidate(state))
+
+    def counts(self):
+        """Return ``{status: count}`` for every known status."""
+        state = self._state()
+        with state.lock:
+            entry = state.entry
+            if entry is not None and entry[0] == state.version and time.monotonic() - entry[1] < state.ttl:
+                return dict(entry[2])
+            version = state.version
+
+        loaded_at = time.monotonic()
+        counts = _load_counts()
+        with state.lock:
+            # A count loaded while a local commit changed it is served but not cached
+            if state.version == version:
+                state.entry = (version, loaded_at, counts)
+        return dict(counts)
+
+    def compute_from_orders(self):
+        """Count orders per status from the raw ``order`` table."""
+        from app import db
+        from app.models import Order
+        return dict(db.session.execute(db.select(Order.status, db.func.count()).group_by(Order.status)).all())
+
+    def rebuild(self):
+        """Replace the counters with values recomputed from the ``order`` table."""
+        from app import db
+        from app.models import OrderStatusCount
+        counts = self.compute_from_orders()
+        db.session.execute(db.delete(OrderStatusCount))
+        if counts:
+            db.session.execute(db.insert(OrderStatusCount), [
+                {'status': status, 'order_count': count} for status, count in counts.items()
+            ])
+        on_commit(db.session, lambda: _invalidate(self._state()))
+        db.session.commit()
+
+    def check(self):
+        """Return ``{status: (stored, expected)}`` for every counter that drifted."""
+        stored = {status: count for status, count in _load_counts().items() if count}
+        expected = self.compute_from_orders()
+        return {
+            status: (stored.get(status, 0), expected.get(status, 0))
+            for status in sorted(set(stored) | set(expected))
+            if stored.get(status, 0) != expected.get(status, 0)
+        }
+
+def _invalidate(state):
+    with state.lock:
+        state.version += 1
+        state.entry = None
+
+def _load_counts():
+    from app import db
+    from app.models import OrderStatusCount
+    from app.services import ORDER_STATUS_TRANSITIONS
+    counts = dict.fromkeys(ORDER_STATUS_TRANSITIONS, 0)
+    counts.update(db.session.execute(db.select(OrderStatusCount.status, OrderStatusCount.order_count)).all())
+    return counts
+
+counters_cli = AppGroup('order-counters', help='Maintain the per-status order counters.')
+
+@counters_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the counters from the order table."""
+    OrderStatusCounters().rebuild()
+    click.echo('Order counters rebuilt.')
+
+@counters_cli.command('check')
+def check_command():
+    """Compare the counters with the order table; exits non-zero on drift."""
+    mismatches = OrderStatusCounters().check()
+    for status, (stored, expected) in mismatches.items():
+        click.echo(f'{status}\tstored={stored}\texpected={expected}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} counter(s) disagree with the order table')
+    click.echo('Order counters match the order table.')
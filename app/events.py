@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import func, select
+from app.txn import on_commit
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOPIC = 'admin'
+SUBSCRIBER_QUEUE_SIZE = 100 # A subscriber further behind than this re-reads the table instead
+
+def order_topic(order_id):
+    return f'order:{order_id}'
+
+class _Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(SUBSCRIBER_QUEUE_SIZE) # (event_id, payload) from the dispatcher
+        self.catch_up = True # Read the table before the queue: set on connect and when the queue overflowed
+
+class _BrokerState:
+    def __init__(self, engine, replay_size, heartbeat_seconds, poll_seconds, max_stream_seconds):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock) # Notified by local commits that published
+        self.generation = 0 # Bumped with every notify, so the dispatcher never misses one
+        self.subscribers = {} # topic -> set of _Subscriber
+        self.dispatcher_pid = None # Process whose dispatcher thread is running, if any
+        self.last_id = 0 # Newest event the dispatcher has fanned out
+        self.replay_size = replay_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.max_stream_seconds = max_stream_seconds
+
+class OrderEventBroker:
+    """Server-Sent Events streams of order status changes, backed by the ``order_event`` table.
+
+    ``publish`` adds the event to the caller's transaction, so it exists
+    exactly when the status change it describes was committed, and its id is
+    the same in every worker process. While anyone is subscribed, one
+    dispatcher thread per process reads new rows every ``SSE_POLL_SECONDS``
+    (at once after a local commit) and hands them to the queues of the
+    streams that want them, so an idle stream costs a queue and no database
+    work. Clients resume with ``Last-Event-ID`` from any worker as long as
+    the event is among the last ``SSE_REPLAY_BUFFER_SIZE`` kept; otherwise
+    they are told to resync. Streams end after ``SSE_MAX_STREAM_SECONDS``
+    and clients reconnect and resume.
+
+    Each open stream still occupies the connection it is served on; see
+    ``gunicorn.conf.py`` for serving the event routes from gevent workers.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app import db
+        app.config.setdefault('SSE_REPLAY_BUFFER_SIZE', 1000)
+        app.config.setdefault('SSE_HEARTBEAT_SECONDS', 15)
+        app.config.setdefault('SSE_POLL_SECONDS', 1.0)
+        app.config.setdefault('SSE_MAX_STREAM_SECONDS', 300)
+        with app.app_context():
+            engine = db.engine
+        app.extensions['order_events'] = _BrokerState(
+            engine,
+            app.config['SSE_REPLAY_BUFFER_SIZE'],
+            app.config['SSE_HEARTBEAT_SECONDS'],
+            app.config['SSE_POLL_SECONDS'],
+            app.config['SSE_MAX_STREAM_SECONDS'],
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['order_events']
+
+    def publish(self, session, order_id, payload):
+        """Record an event for ``order_id`` in ``session``'s transaction."""
+        _publish(self._state(), session, order_id, payload)
+
+    def response(self, order_id=None):
+        """Build the streaming response for the current request, honouring ``Last-Event-ID``."""
+        last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        response = current_app.response_class(_stream(self._state(), order_id, last_event_id), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no' # Keep reverse proxies from buffering the stream
+        return response
+
+def _publish(state, session, order_id, payload):
+    from app.models import OrderEvent
+    table = OrderEvent.__table__
+    event_id = session.execute(table.insert().values(
+        order_id=order_id, payload=json.dumps(payload), created_at=datetime.utcnow(),
+    )).inserted_primary_key[0]
+    if state.replay_size is not None:
+        session.execute(table.delete().where(table.c.id <= event_id - state.replay_size))
+    on_commit(session, lambda: _notify(state))
+
+def _notify(state):
+    with state.lock:
+        state.generation += 1
+        state.wakeup.notify_all()
+
+def _newest_id(connection):
+    from app.models import OrderEvent
+    return connection.execute(select(func.max(OrderEvent.__table__.c.id))).scalar() or 0
+
+def _subscribe(state, topic):
+    subscriber = _Subscriber()
+    with state.engine.connect() as connection:
+        newest_id = _newest_id(connection)
+    with state.lock:
+        state.subscribers.setdefault(topic, set()).add(subscriber)
+        # Threads do not survive fork, so each worker process starts its own dispatcher
+        if state.dispatcher_pid != os.getpid():
+            state.dispatcher_pid = os.getpid()
+            state.last_id = newest_id # The subscriber's own catch-up read covers anything older
+            threading.Thread(target=_dispatch, args=(state,), name='order-events-dispatcher', daemon=True).start()
+    return subscriber
+
+def _unsubscribe(state, topic, subscriber):
+    with state.lock:
+        subscribers = state.subscribers[topic]
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del state.subscribers[topic]
+            if not state.subscribers:
+                state.wakeup.notify_all() # Lets the dispatcher exit now rather than after its next tick
+
+def _dispatch(state):
+    from app.models import OrderEvent
+    table = OrderEvent.__table__
+    while True:
+        with state.lock:
+            if not state.subscribers:
+                state.dispatcher_pid = None
+                return
+            generation, last_id = state.generation, state.last_id
+        try:
+            with state.engine.connect() as connection:
+                rows = connection.execute(
+                    select(table.c.id, table.c.order_id, table.c.payload).where(table.c.id > last_id).order_by(table.c.id)
+                ).all()
+        except Exception:
+            logger.exception('Reading order events failed')
+            rows = []
+        with state.lock:
+            for event_id, order_id, data in rows:
+                for topic in (order_topic(order_id), ADMIN_TOPIC):
+                    for subscriber in state.subscribers.get(topic, ()):
+                        try:
+                            subscriber.queue.put_nowait((event_id, data))
+                        except queue.Full:
+                            subscriber.catch_up = True
+            if rows:
+                state.last_id = rows[-1][0]
+            if state.generation == generation and state.subscribers:
+                state.wakeup.wait(state.poll_seconds)
+
+def _catch_up(engine, order_id, cursor):
+    # ``(events after cursor, newest id)``; ``events`` is ``None`` if some were already pruned
+    from app.models import OrderEvent
+    table = OrderEvent.__table__
+    with engine.connect() as connection:
+        oldest_id, newest_id = connection.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+        newest_id = newest_id or 0
+        if cursor is None or cursor == newest_id:
+            return [], newest_id
+        if cursor > newest_id or cursor < oldest_id - 1:
+            return None, newest_id
+        query = select(table.c.id, table.c.payload).where(table.c.id > cursor).order_by(table.c.id)
+        if order_id is not None:
+            query = query.where(table.c.order_id == order_id)
+        return connection.execute(query).all(), newest_id
+
+def _stream(state, order_id, last_event_id):
+    topic = ADMIN_TOPIC if order_id is None else order_topic(order_id)
+    subscriber = _subscribe(state, topic)
+    try:
+        yield from _frames(state, subscriber, order_id, last_event_id)
+    finally:
+        _unsubscribe(state, topic, subscriber)
+
+def _frames(state, subscriber, order_id, cursor):
+    deadline = None if state.max_stream_seconds is None else time.monotonic() + state.max_stream_seconds
+    yield 'retry: 3000\n\n'
+    idle_since = time.monotonic()
+    while deadline is None or time.monotonic() < deadline:
+        if subscriber.catch_up:
+            # Registered before reading, so every later event also arrives through the queue
+            subscriber.catch_up = False
+            events, newest_id = _catch_up(state.engine, order_id, cursor)
+            if events is None:
+                # The client was away longer than the table keeps events, or the id
+                # was never issued (e.g. it came from another database): start afresh
+                yield f'id: {newest_id}\nevent: resync\ndata: {{}}\n\n'
+                idle_since = time.monotonic()
+            for event_id, data in events or ():
+                yield f'id: {event_id}\nevent: status\ndata: {data}\n\n'
+                idle_since = time.monotonic()
+            # Also skip past events for other orders, so they are not read again
+            cursor = newest_id
+            continue
+
+        now = time.monotonic()
+        timeout = idle_since + state.heartbeat_seconds - now
+        if deadline is not None:
+            timeout = min(timeout, deadline - now)
+        try:
+            event_id, data = subscriber.queue.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            if time.monotonic() - idle_since >= state.heartbeat_seconds:
+                yield ': heartbeat\n\n'
+                idle_since = time.monotonic()
+            continue
+        if event_id > cursor: # Already sent by the catch-up read otherwise
+            yield f'id: {event_id}\nevent: status\ndata: {data}\n\n'
+            cursor = event_id
+            idle_since = time.monotonic()
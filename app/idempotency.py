@@ -0,0 +1,296 @@
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+MAX_KEY_LENGTH = 255
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None # (request_hash, body, status_code) once the request finished
+
+class IdempotencyConflict(RuntimeError):
+    """Raised on commit when another request took over the key; the transaction is not committed."""
+
+class _Claim:
+    def __init__(self, key, owner, ttl):
+        self.key = key
+        self.owner = owner # Token stored on the record; every later write checks it is still ours
+        self.ttl = ttl
+        self.committed = False # The handler's transaction committed while holding the claim
+        self.lost = False # The claim was taken over before the handler's transaction could commit
+
+class _IdempotencyState:
+    def __init__(self, cache_size, ttl, lock_timeout, purge_every):
+        self.lock = threading.Lock()
+        self.cache = OrderedDict() # key -> (request_hash, body, status_code, expires_at), least recently used first
+        self.cache_size = cache_size
+        self.in_flight = {} # key -> _InFlight
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.purge_every = purge_every
+        self.claims = 0
+
+class IdempotencyStore:
+    """``Idempotency-Key`` support: run a request once, replay its response afterwards.
+
+    Completed responses live in a bounded in-memory LRU backed by the
+    ``idempotency_record`` table, so replays usually cost no database work at
+    all and still survive restarts and reach every worker process. Concurrent
+    requests with the same key in one process wait for the first one and
+    share its response; in other processes they see the claimed record and
+    get a 409 until it completes. Responses with a 5xx status are not stored,
+    so those requests can be retried. Records expire after
+    ``IDEMPOTENCY_TTL_SECONDS``.
+
+    Each claim carries an owner token. A claim older than
+    ``IDEMPOTENCY_LOCK_SECONDS`` may be taken over by one other request, and
+    the handler's transaction re-checks the token before it commits: a
+    request whose claim was taken over has its order rolled back and gets a
+    409, so a key never creates two orders. The same check also extends the
+    record to the full TTL, so should the process die before the response is
+    stored, retries keep getting a 409 until it expires instead of running
+    again.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60)
+        app.config.setdefault('IDEMPOTENCY_CACHE_SIZE', 10000)
+        app.config.setdefault('IDEMPOTENCY_LOCK_SECONDS', 60) # A claim older than this is treated as abandoned
+        app.config.setdefault('IDEMPOTENCY_PURGE_EVERY', 1000) # Delete expired records every N new keys
+        app.extensions['idempotency'] = _IdempotencyState(
+            app.config['IDEMPOTENCY_CACHE_SIZE'],
+            timedelta(seconds=app.config['IDEMPOTENCY_TTL_SECONDS']),
+            timedelta(seconds=app.config['IDEMPOTENCY_LOCK_SECONDS']),
+            app.config['IDEMPOTENCY_PURGE_EVERY'],
+        )
+        app.cli.add_command(idempotency_cli)
+        _register_session_listeners()
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['idempotency']
+
+    def run(self, key, payload, handler):
+        """Return ``(body, status_code, headers)`` for ``handler()`` under ``key``.
+
+        ``payload`` identifies the request; reusing a key for a different
+        payload is rejected with a 422.
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return {'message': f'Idempotency-Key must be between 1 and {MAX_KEY_LENGTH} characters'}, 400, {}
+        state = self._state()
+        request_hash = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+        with state.lock:
+            cached = _cache_get(state, key)
+            in_flight = state.in_flight.get(key) if cached is None else None
+            owner = cached is None and in_flight is None
+            if owner:
+                in_flight = state.in_flight[key] = _InFlight()
+        if cached is not None:
+            return _replay(request_hash, *cached[:3])
+        if not owner:
+            # Same key already running in this process: share its outcome
+            in_flight.done.wait(state.lock_timeout.total_seconds())
+            if in_flight.result is None:
+                return _in_progress()
+            return _replay(request_hash, *in_flight.result)
+
+        try:
+            claim, stored = _claim(state, key, request_hash)
+            if stored is not None:
+                if stored == 'in_progress':
+                    return _in_progress()
+                with state.lock:
+                    _cache_put(state, key, stored)
+                return _replay(request_hash, *stored[:3])
+
+            from app import db
+            db.session.info['idempotency_claim'] = claim
+            try:
+                body, status_code = handler()
+            except BaseException:
+                db.session.info.pop('idempotency_claim', None)
+                if not claim.committed:
+                    _release(claim)
+                raise
+            db.session.info.pop('idempotency_claim', None)
+            if claim.lost:
+                return _in_progress()
+            if status_code >= 500 and not claim.committed:
+                _release(claim)
+            else:
+                entry = _complete(claim, request_hash, body, status_code)
+                if entry is not None:
+                    with state.lock:
+                        _cache_put(state, key, entry)
+                in_flight.result = (request_hash, body, status_code)
+            return body, status_code, {}
+        finally:
+            with state.lock:
+                state.in_flight.pop(key, None)
+            in_flight.done.set()
+
+    def purge_expired(self):
+        """Delete expired records; returns how many were removed."""
+        from app import db
+        from app.models import IdempotencyRecord
+        deleted = db.session.execute(
+            db.delete(IdempotencyRecord).where(IdempotencyRecord.expires_at < datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        return deleted
+
+def _cache_get(state, key):
+    entry = state.cache.get(key)
+    if entry is None:
+        return None
+    if entry[3] <= datetime.utcnow():
+        del state.cache[key]
+        return None
+    state.cache.move_to_end(key)
+    return entry
+
+def _cache_put(state, key, entry):
+    state.cache[key] = entry
+    state.cache.move_to_end(key)
+    while len(state.cache) > state.cache_size:
+        state.cache.popitem(last=False)
+
+def _replay(request_hash, stored_hash, body, status_code):
+    if stored_hash != request_hash:
+        return {'message': 'This Idempotency-Key was already used with a different request'}, 422, {}
+    return body, status_code, {'Idempotent-Replayed': 'true'}
+
+def _in_progress():
+    return {'message': 'A request with this Idempotency-Key is still in progress. Please retry.'}, 409, {'Retry-After': '1'}
+
+def _claim(state, key, request_hash):
+    # Insert or take over the record for ``key``. Returns ``(claim, None)`` when this request
+    # now owns the key, or ``(None, stored)`` with the stored (request_hash, body, status_code,
+    # expires_at) when it already completed, or 'in_progress' when another request is running it
+    from app import db
+    from app.models import IdempotencyRecord
+    now = datetime.utcnow()
+    claim = _Claim(key, uuid.uuid4().hex, state.ttl)
+    values = {'request_hash': request_hash, 'status_code': None, 'response_body': None,
+              'owner': claim.owner, 'created_at': now, 'expires_at': now + state.lock_timeout}
+    record = db.session.get(IdempotencyRecord, key)
+    if record is not None and record.expires_at > now:
+        result = _stored(record)
+        db.session.rollback()
+        return None, result
+    if record is not None:
+        # Expired result or abandoned claim: of all the requests that saw it expired, only
+        # the one whose UPDATE still matches it takes it over
+        taken = db.session.execute(
+            db.update(IdempotencyRecord)
+            .where(IdempotencyRecord.key == key, IdempotencyRecord.expires_at <= now)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if taken != 1:
+            return None, 'in_progress'
+    else:
+        db.session.add(IdempotencyRecord(key=key, **values))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            record = db.session.get(IdempotencyRecord, key)
+            result = _stored(record) if record is not None else 'in_progress'
+            db.session.rollback()
+            return None, result
+
+    with state.lock:
+        state.claims += 1
+        purge = state.purge_every and state.claims % state.purge_every == 0
+    if purge:
+        IdempotencyStore().purge_expired()
+    return claim, None
+
+def _stored(record):
+    if record.status_code is None:
+        return 'in_progress'
+    return record.request_hash, json.loads(record.response_body), record.status_code, record.expires_at
+
+def _owned(claim):
+    from app.models import IdempotencyRecord
+    return (IdempotencyRecord.key == claim.key, IdempotencyRecord.owner == claim.owner,
+            IdempotencyRecord.status_code.is_(None))
+
+def _complete(claim, request_hash, body, status_code):
+    # Store the response; returns the cache entry, or None if the claim is no longer ours
+    from app import db
+    from app.models import IdempotencyRecord
+    expires_at = datetime.utcnow() + claim.ttl
+    db.session.rollback() # The handler's own transaction is over; start clean
+    completed = db.session.execute(
+        db.update(IdempotencyRecord)
+        .where(*_owned(claim))
+        .values(status_code=status_code, response_body=json.dumps(body), expires_at=expires_at)
+    ).rowcount
+    db.session.commit()
+    if completed != 1:
+        return None
+    return request_hash, body, status_code, expires_at
+
+def _release(claim):
+    # Drop the claim so the client can retry with the same key
+    from app import db
+    from app.models import IdempotencyRecord
+    db.session.rollback()
+    db.session.execute(db.delete(IdempotencyRecord).where(*_owned(claim)))
+    db.session.commit()
+
+_listeners_registered = False
+
+def _register_session_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    _listeners_registered = True
+
+    @event.listens_for(Session, 'before_commit')
+    def _confirm_claim_before_commit(session):
+        # In the handler's own transaction: commit only while the key is still ours
+        claim = session.info.get('idempotency_claim')
+        if claim is None or claim.committed:
+            return
+        from app.models import IdempotencyRecord
+        confirmed = session.execute(
+            IdempotencyRecord.__table__.update()
+            .where(*_owned(claim))
+            .values(expires_at=datetime.utcnow() + claim.ttl)
+        ).rowcount
+        if confirmed != 1:
+            claim.lost = True
+            raise IdempotencyConflict(f'Idempotency-Key {claim.key!r} was taken over by another request')
+
+    @event.listens_for(Session, 'after_commit')
+    def _mark_claim_committed(session):
+        claim = session.info.get('idempotency_claim')
+        if claim is not None:
+            claim.committed = True
+
+idempotency_cli = AppGroup('idempotency-keys', help='Maintain stored Idempotency-Key responses.')
+
+@idempotency_cli.command('purge')
+def purge_command():
+    """Delete expired Idempotency-Key records."""
+    click.echo(f'Deleted {IdempotencyStore().purge_expired()} expired record(s).')
@@ -0,0 +1,199 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+from app.txn import on_commit
+
+logger = logging.getLogger(__name__)
+
+class _LedgerState:
+    def __init__(self, engine, table, flush_size, flush_interval):
+        self.engine = engine
+        self.table = table
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.wakeup = threading.Event()
+        self.flusher_pid = None
+
+class StockLedger:
+    """Append-only log of stock movements, written through an in-process buffer.
+
+    Movements are staged on the session and only enter the buffer once the
+    transaction that changed the stock has committed. A background thread
+    writes the buffer in batches every ``LEDGER_FLUSH_INTERVAL`` seconds, or
+    sooner once ``LEDGER_FLUSH_SIZE`` rows are waiting, so order creation never
+    pays for the ledger insert itself.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app import db
+        from app.models import StockMovement
+        app.config.setdefault('LEDGER_FLUSH_SIZE', 500)
+        app.config.setdefault('LEDGER_FLUSH_INTERVAL', 1.0)
+        with app.app_context():
+            engine = db.engine
+        in_memory = engine.url.get_backend_name() == 'sqlite' and engine.url.database in (None, '', ':memory:')
+        # In-memory SQLite shares one connection across threads, so flush inline instead
+        flush_interval = None if in_memory else app.config['LEDGER_FLUSH_INTERVAL']
+        state = _LedgerState(engine, StockMovement.__table__, app.config['LEDGER_FLUSH_SIZE'], flush_interval)
+        app.extensions['stock_ledger'] = state
+        if not in_memory:
+            atexit.register(_flush_at_exit, state)
+        app.cli.add_command(ledger_cli)
+        _register_mapper_listeners()
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['stock_ledger']
+
+    def record(self, session, menu_item_id, delta, reason, order_id=None):
+        """Stage a movement; it is buffered when ``session`` commits."""
+        _stage(self._state(), session, _movement(menu_item_id, delta, reason, order_id))
+
+    def flush(self):
+        return _flush(self._state())
+
+    def rebuild_stock(self):
+        """Return ``{menu_item_id: stock}`` as recomputed from the ledger alone."""
+        from app import db
+        from app.models import StockMovement
+        self.flush()
+        rows = db.session.execute(
+            db.select(StockMovement.menu_item_id, db.func.sum(StockMovement.delta))
+            .group_by(StockMovement.menu_item_id)
+        )
+        return {menu_item_id: int(total) for menu_item_id, total in rows}
+
+    def reconcile(self):
+        """Compare every menu item's stock with the ledger; return the mismatches."""
+        from app import db
+        from app.models import MenuItem
+        ledger_stock = self.rebuild_stock()
+        mismatches = []
+        for menu_item_id, name, stock in db.session.execute(db.select(MenuItem.id, MenuItem.name, MenuItem.stock).order_by(MenuItem.id)):
+            expected = ledger_stock.get(menu_item_id, 0)
+            if expected != stock:
+                mismatches.append({'menu_item_id': menu_item_id, 'name': name, 'stock': stock, 'ledger_stock': expected})
+        return mismatches
+
+def _movement(menu_item_id, delta, reason, order_id=None):
+    return {
+        'menu_item_id': menu_item_id,
+        'delta': delta,
+        'reason': reason,
+        'order_id': order_id,
+        'created_at': datetime.utcnow(),
+    }
+
+def _stage(state, session, row):
+    on_commit(session, lambda: _append(state, row))
+
+def _append(state, row):
+    with state.lock:
+        state.buffer.append(row)
+        pending = len(state.buffer)
+    if state.flush_interval is None:
+        if pending >= state.flush_size:
+            _flush(state)
+        return
+    _ensure_flusher(state)
+    if pending >= state.flush_size:
+        state.wakeup.set()
+
+def _flush(state):
+    with state.lock:
+        rows, state.buffer = state.buffer, []
+    if rows:
+        try:
+            with state.engine.begin() as connection:
+                connection.execute(state.table.insert(), rows)
+        except BaseException:
+            # Put the rows back (ahead of anything appended meanwhile) so the next flush retries them
+            with state.lock:
+                state.buffer[:0] = rows
+            raise
+    return len(rows)
+
+def _flush_at_exit(state):
+    try:
+        _flush(state)
+    except Exception:
+        logger.exception('Stock ledger flush at exit failed')
+
+def _ensure_flusher(state):
+    # Threads do not survive fork, so each worker process starts its own flusher
+    if state.flusher_pid == os.getpid():
+        return
+    with state.lock:
+        if state.flusher_pid == os.getpid():
+            return
+        state.flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, args=(state,), name='stock-ledger-flusher', daemon=True).start()
+
+def _flush_loop(state):
+    while True:
+        state.wakeup.wait(state.flush_interval)
+        state.wakeup.clear()
+        try:
+            _flush(state)
+        except Exception:
+            logger.exception('Stock ledger flush failed')
+
+_listeners_registered = False
+
+def _register_mapper_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    _listeners_registered = True
+    from app.models import MenuItem
+
+    # Stock written through the ORM (new items, manual adjustments) is ledgered here;
+    # order flows decrement with SQL statements and record their movements explicitly
+    @event.listens_for(MenuItem, 'after_insert')
+    def _record_initial_stock(mapper, connection, target):
+        if target.stock:
+            _record_from_flush(target, target.stock, 'initial')
+
+    @event.listens_for(MenuItem, 'after_update')
+    def _record_adjustment(mapper, connection, target):
+        history = inspect(target).attrs.stock.history
+        if history.deleted and history.added:
+            delta = (history.added[0] or 0) - (history.deleted[0] or 0)
+            if delta:
+                _record_from_flush(target, delta, 'adjustment')
+
+def _record_from_flush(target, delta, reason):
+    session = object_session(target)
+    if session is not None and 'stock_ledger' in current_app.extensions:
+        _stage(current_app.extensions['stock_ledger'], session, _movement(target.id, delta, reason))
+
+ledger_cli = AppGroup('stock-ledger', help='Inspect the stock movement ledger.')
+
+@ledger_cli.command('rebuild')
+def rebuild_command():
+    """Print every item's stock as recomputed from the ledger."""
+    for menu_item_id, stock in sorted(StockLedger().rebuild_stock().items()):
+        click.echo(f'{menu_item_id}\t{stock}')
+
+@ledger_cli.command('check')
+def check_command():
+    """Compare MenuItem.stock with the ledger; exits non-zero on drift."""
+    mismatches = StockLedger().reconcile()
+    for mismatch in mismatches:
+        click.echo(f"{mismatch['menu_item_id']}\t{mismatch['name']}\tstock={mismatch['stock']}\tledger={mismatch['ledger_stock']}")
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} menu item(s) disagree with the stock ledger')
+    click.echo('Stock matches the ledger.')
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class _MenuCacheState:
+    def __init__(self, check_interval, ttl):
+        self.lock = threading.Lock()
+        self.version = 0 # Bumped by local commits, so this process sees its own writes at once
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self.entry = None # (version, shared_version, built_at, checked_at, etag, body)
+
+class MenuCache:
+    """In-process cache of the serialized menu, keyed by the shared menu version.
+
+    Every commit that touched ``MenuItem`` rows, whether through the ORM or
+    through bulk/conditional ``UPDATE`` statements such as the stock
+    reservation in ``OrderService.create_order``, also bumps the single
+    ``menu_version`` row in the same transaction. Each process compares its
+    cached entry with that row at most every ``MENU_CACHE_CHECK_SECONDS``, so
+    a write made by another worker shows up within that interval, and a local
+    commit invalidates the cache at once. ``MENU_CACHE_TTL_SECONDS`` bounds
+    the age of any entry, as a backstop for writes that bypass the session.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MENU_CACHE_CHECK_SECONDS', 1.0)
+        app.config.setdefault('MENU_CACHE_TTL_SECONDS', 60.0)
+        app.extensions['menu_cache'] = _MenuCacheState(
+            app.config['MENU_CACHE_CHECK_SECONDS'],
+            app.config['MENU_CACHE_TTL_SECONDS'],
+        )
+        _register_session_listeners()
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['menu_cache']
+
+    def invalidate(self):
+        _invalidate(self._state())
+
+    def get_or_build(self, build_menu):
+        """Return ``(etag, body)`` for the current menu version.
+
+        ``build_menu`` is only called on a miss. A payload built while the
+        version moved underneath it is served but not cached, so a concurrent
+        stock change can never pin a stale menu.
+        """
+        state = self._state()
+        now = time.monotonic()
+        with state.lock:
+            version, entry = state.version, state.entry
+            if entry is not None and entry[0] == version and now - entry[2] < state.ttl \
+                    and now - entry[3] < state.check_interval:
+                return entry[4], entry[5]
+
+        shared_version = _load_shared_version()
+        if entry is not None and entry[0] == version and entry[1] == shared_version and now - entry[2] < state.ttl:
+            with state.lock:
+                if state.entry is entry:
+                    state.entry = (*entry[:3], now, *entry[4:])
+            return entry[4], entry[5]
+
+        body = (json.dumps({'menu': build_menu()}) + '\n').encode('utf-8')
+        # Content-based ETag, so every worker process agrees on it
+        etag = hashlib.sha1(body).hexdigest()
+        with state.lock:
+            if state.version == version:
+                state.entry = (version, shared_version, now, now, etag, body)
+        return etag, body
+
+def _invalidate(state):
+    with state.lock:
+        state.version += 1
+        state.entry = None
+
+def _load_shared_version():
+    from app import db
+    from app.models import MenuVersion
+    return db.session.execute(db.select(MenuVersion.version).where(MenuVersion.id == 1)).scalar() or 0
+
+def _bump_shared_version(session):
+    from app.models import MenuVersion
+    table = MenuVersion.__table__
+    bumped = session.execute(table.update().where(table.c.id == 1).values(version=table.c.version + 1)).rowcount
+    if not bumped:
+        session.execute(table.insert().values(id=1, version=1))
+
+_listeners_registered = False
+
+def _touches_menu(orm_execute_state):
+    from app.models import MenuItem
+    if any(mapper.class_ is MenuItem for mapper in orm_execute_state.all_mappers):
+        return True
+    # Core statements against the table itself (e.g. executemany stock restores)
+    return getattr(orm_execute_state.statement, 'table', None) is MenuItem.__table__
+
+def _register_session_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    _listeners_registered = True
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def _flag_bulk_statements(orm_execute_state):
+        if (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert) \
+                and _touches_menu(orm_execute_state):
+            orm_execute_state.session.info['menu_changed'] = True
+
+    @event.listens_for(Session, 'after_flush')
+    def _flag_flushed_objects(session, flush_context):
+        from app.models import MenuItem
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, MenuItem):
+                session.info['menu_changed'] = True
+                break
+
+    @event.listens_for(Session, 'before_commit')
+    def _bump_version_before_commit(session):
+        # Flush first so pending MenuItem objects are flagged, then bump the
+        # shared version in the same transaction as the menu change itself
+        session.flush()
+        if session.info.get('menu_changed'):
+            _bump_shared_version(session)
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate_after_commit(session):
+        if session.info.pop('menu_changed', False) and has_app_context() \
+                and 'menu_cache' in current_app.extensions:
+            _invalidate(current_app.extensions['menu_cache'])
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard_on_rollback(session):
+        session.info.pop('menu_changed', None)
@@ -0,0 +1,185 @@
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# [statement count, seconds in SQL] for the request running in the current context
+_request_sql = contextvars.ContextVar('request_sql', default=None)
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+class _RouteStats:
+    __slots__ = ('latency', 'sql_statements', 'sql_seconds', 'responses')
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.sql_statements = _Histogram(SQL_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.responses = {} # status code -> count
+
+class _MetricsState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {} # (method, route) -> _RouteStats
+
+class RequestMetrics:
+    """Per-route latency histograms and SQL statement counts/time per request.
+
+    Collected data is exposed in Prometheus text format on ``METRICS_PATH``.
+    Requests slower than ``SLOW_REQUEST_THRESHOLD_MS`` are logged when that
+    setting is not ``None``.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_PATH', '/metrics')
+        app.config.setdefault('SLOW_REQUEST_THRESHOLD_MS', None)
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.extensions['request_metrics'] = _MetricsState()
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+        app.teardown_request(_reset_request)
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', _metrics_view)
+        _register_engine_listeners()
+
+def _start_request():
+    request.environ['metrics.started'] = time.perf_counter()
+    _request_sql.set([0, 0.0])
+
+def _finish_request(response):
+    started = request.environ.get('metrics.started')
+    sql = _request_sql.get()
+    if started is None or sql is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    key = (request.method, route)
+
+    state = current_app.extensions['request_metrics']
+    with state.lock:
+        stats = state.routes.get(key)
+        if stats is None:
+            stats = state.routes[key] = _RouteStats()
+        stats.latency.observe(elapsed)
+        stats.sql_statements.observe(sql[0])
+        stats.sql_seconds += sql[1]
+        stats.responses[response.status_code] = stats.responses.get(response.status_code, 0) + 1
+
+    threshold = current_app.config['SLOW_REQUEST_THRESHOLD_MS']
+    if threshold is not None and elapsed * 1000 >= threshold:
+        logger.warning('Slow request: %s %s (%s) -> %s in %.1fms, %d SQL statements, %.1fms in SQL',
+                       request.method, request.full_path.rstrip('?'), route, response.status_code,
+                       elapsed * 1000, sql[0], sql[1] * 1000)
+    return response
+
+def _reset_request(exc):
+    _request_sql.set(None)
+
+_listeners_registered = False
+
+def _register_engine_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    _listeners_registered = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _request_sql.get() is not None:
+            conn.info.setdefault('metrics.query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sql = _request_sql.get()
+        started = conn.info.get('metrics.query_started')
+        if sql is None or not started:
+            return
+        sql[0] += 1
+        sql[1] += time.perf_counter() - started.pop()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _histogram_lines(name, labels, histogram):
+    cumulative = 0
+    for bound, count in zip((*histogram.bounds, '+Inf'), histogram.counts):
+        cumulative += count
+        yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+    yield f'{name}_sum{{{labels}}} {histogram.total}'
+    yield f'{name}_count{{{labels}}} {histogram.count}'
+
+def render_prometheus(state):
+    with state.lock:
+        # Copy under the lock so rendering never blocks request recording for long
+        routes = [
+            (key, _copy_histogram(stats.latency), _copy_histogram(stats.sql_statements), stats.sql_seconds, dict(stats.responses))
+            for key, stats in sorted(state.routes.items())
+        ]
+
+    lines = [
+        '# HELP http_requests_total Requests handled, by route and status code.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (method, route), _, _, _, responses in routes:
+        for status, count in sorted(responses.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Request latency, by route.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (method, route), latency, _, _, _ in routes:
+        lines.extend(_histogram_lines('http_request_duration_seconds', f'method="{method}",route="{_escape(route)}"', latency))
+
+    lines += [
+        '# HELP http_request_sql_statements SQL statements executed per request, by route.',
+        '# TYPE http_request_sql_statements histogram',
+    ]
+    for (method, route), _, sql_statements, _, _ in routes:
+        lines.extend(_histogram_lines('http_request_sql_statements', f'method="{method}",route="{_escape(route)}"', sql_statements))
+
+    lines += [
+        '# HELP http_request_sql_duration_seconds_total Time spent executing SQL, by route.',
+        '# TYPE http_request_sql_duration_seconds_total counter',
+    ]
+    for (method, route), _, _, sql_seconds, _ in routes:
+        lines.append(f'http_request_sql_duration_seconds_total{{method="{method}",route="{_escape(route)}"}} {sql_seconds}')
+    return '\n'.join(lines) + '\n'
+
+def _copy_histogram(histogram):
+    copy = _Histogram(histogram.bounds)
+    copy.counts = list(histogram.counts)
+    copy.total = histogram.total
+    copy.count = histogram.count
+    return copy
+
+def _metrics_view():
+    body = render_prometheus(current_app.extensions['request_metrics'])
+    return current_app.response_class(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,5 @@
 from datetime import datetime
-from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app import db, password_hasher
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,10 +9,14 @@ class User(db.Model):
     orders = db.relationship('Order', backref='customer', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        matches, new_hash = password_hasher.verify(self.password_hash, password)
+        if new_hash:
+            # Hashed with an older method or cost: upgrade it, saved with the session's next commit
+            self.password_hash = new_hash
+        return matches
 
     def __repr__(self):
         return '<User {}>'.format(self.username)
@@ -25,25 +28,44 @@ class MenuItem(db.Model):
     price = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False, default=0)
     image_url = db.Column(db.String(256))
+    low_stock_threshold = db.Column(db.Integer) # None falls back to LOW_STOCK_THRESHOLD
 
     def __repr__(self):
         return '<MenuItem {}>'.format(self.name)
 
+class MenuVersion(db.Model):
+    # A single row (id 1), bumped in every transaction that writes MenuItem rows; keys the menu cache
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<MenuVersion {}>'.format(self.version)
+
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    status = db.Column(db.String(64), nullable=False, default='pending') # e.g., 'pending', 'processing', 'completed', 'cancelled'
+    status = db.Column(db.String(64), nullable=False, default='pending') # See ORDER_STATUS_TRANSITIONS in app.services
+    previous_status = db.Column(db.String(64)) # Set by the conditional UPDATE that changed status
     created_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Denormalized from the order's items when it is created, so totals need no join
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    item_count = db.Column(db.Integer, nullable=False, default=0) # Sum of item quantities
     items = db.relationship('OrderItem', backref='order', lazy='dynamic')
 
+    # Composite indexes matching the admin list filters, which always sort by created_at
+    __table_args__ = (
+        db.Index('ix_order_status_created_at', 'status', 'created_at'),
+        db.Index('ix_order_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     def __repr__(self):
         return '<Order {}>'.format(self.id)
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
-    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), index=True, nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), index=True, nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False) # Price at the time of order
 
@@ -51,3 +73,99 @@ class OrderItem(db.Model):
 
     def __repr__(self):
         return '<OrderItem {}>'.format(self.id)
+
+class StockMovement(db.Model):
+    # Append-only stock ledger; the sum of deltas per item equals its current stock
+    id = db.Column(db.Integer, primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), index=True, nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(32), nullable=False) # e.g., 'initial', 'order', 'adjustment'
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<StockMovement {} {:+d}>'.format(self.menu_item_id, self.delta)
+
+class LowStockAlert(db.Model):
+    # Written by app.alerts in the transaction whose stock change crossed the threshold
+    id = db.Column(db.Integer, primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), index=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    stock = db.Column(db.Integer, nullable=False)
+    threshold = db.Column(db.Integer, nullable=False)
+    message = db.Column(db.String(256), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<LowStockAlert {} {}>'.format(self.menu_item_id, self.stock)
+
+class OrderEvent(db.Model):
+    # Outbox of status changes, written by app.events in the transaction that made them;
+    # the id is the SSE event id, the same in every worker process
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), index=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False) # JSON, sent as the event data
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<OrderEvent {} {}>'.format(self.id, self.order_id)
+
+# Sales rollups, maintained incrementally by app.reports in the same transaction
+# as the order change. Buckets use the order's created_at (UTC); cancelled
+# orders are not counted as sales.
+class DailySales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return '<DailySales {}>'.format(self.day)
+
+class HourlySales(db.Model):
+    hour = db.Column(db.DateTime, primary_key=True) # Start of the hour
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return '<HourlySales {}>'.format(self.hour)
+
+class MenuItemDailySales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_item.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return '<MenuItemDailySales {} {}>'.format(self.day, self.menu_item_id)
+
+class DailyOrderStatus(db.Model):
+    # Orders created on ``day`` that are currently in ``status``
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(64), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<DailyOrderStatus {} {}>'.format(self.day, self.status)
+
+class OrderStatusCount(db.Model):
+    # Orders currently in ``status``, over all days; backs the admin dashboard
+    status = db.Column(db.String(64), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<OrderStatusCount {}>'.format(self.status)
+
+class IdempotencyRecord(db.Model):
+    # Stored response for an Idempotency-Key; status_code is NULL while the request is in progress
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    owner = db.Column(db.String(32)) # Token of the request holding the claim, see app.idempotency
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True, nullable=False)
+
+    def __repr__(self):
+        return '<IdempotencyRecord {}>'.format(self.key)
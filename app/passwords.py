@@ -0,0 +1,124 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when no hashing slot became free within ``PASSWORD_HASH_WAIT_SECONDS``."""
+
+class _HasherState:
+    def __init__(self, method, workers, max_pending, wait_seconds):
+        self.method = method
+        self.workers = workers
+        self.wait_seconds = wait_seconds
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.executor_pid = None
+        self.prefix = None # Hash prefix produced by ``method``, found on first use
+
+class PasswordHasher:
+    """Runs password hashing and verification on a small, bounded thread pool.
+
+    Key derivation is deliberately slow. PBKDF2, scrypt and bcrypt release the
+    GIL while they run, so ``PASSWORD_HASH_WORKERS`` caps how many cores
+    logins can occupy at once, and ``PASSWORD_HASH_MAX_PENDING`` caps how
+    many callers may wait for the pool. A login burst beyond that fails fast
+    with ``PasswordHashingBusy`` instead of queueing behind itself while
+    order requests starve.
+
+    ``PASSWORD_HASH_METHOD`` is a werkzeug method such as
+    ``pbkdf2:sha256:600000`` or ``scrypt:32768:8:1``, or ``bcrypt:<rounds>``.
+    Hashes made with any other method still verify and are replaced with
+    the configured one by ``verify``.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1))
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', app.config['PASSWORD_HASH_WORKERS'] * 4)
+        app.config.setdefault('PASSWORD_HASH_WAIT_SECONDS', 5.0)
+        app.extensions['password_hasher'] = _HasherState(
+            app.config['PASSWORD_HASH_METHOD'],
+            app.config['PASSWORD_HASH_WORKERS'],
+            app.config['PASSWORD_HASH_MAX_PENDING'],
+            app.config['PASSWORD_HASH_WAIT_SECONDS'],
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['password_hasher']
+
+    def hash(self, password):
+        state = self._state()
+        return _run(state, _hash, password, state.method)
+
+    def verify(self, password_hash, password):
+        """Check ``password``; return ``(matches, new_hash)``.
+
+        ``new_hash`` is set when the password matched but ``password_hash``
+        was made with another method or cost, so the caller can store it.
+        """
+        state = self._state()
+        return _run(state, _verify, state, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        state = self._state()
+        prefix = state.prefix or _run(state, _method_prefix, state)
+        return not password_hash.startswith(prefix)
+
+def _run(state, fn, *args):
+    if not state.slots.acquire(timeout=state.wait_seconds):
+        raise PasswordHashingBusy('Too many password operations in progress. Please retry.')
+    try:
+        future = _executor(state).submit(fn, *args)
+    except BaseException:
+        state.slots.release()
+        raise
+    future.add_done_callback(lambda _: state.slots.release())
+    return future.result()
+
+def _executor(state):
+    # Pool threads do not survive fork, so every worker process builds its own pool
+    if state.executor_pid != os.getpid():
+        with state.lock:
+            if state.executor_pid != os.getpid():
+                state.executor = ThreadPoolExecutor(max_workers=state.workers, thread_name_prefix='password-hasher')
+                state.executor_pid = os.getpid()
+    return state.executor
+
+def _hash(password, method):
+    if method.startswith('bcrypt'):
+        import bcrypt
+        _, _, rounds = method.partition(':')
+        salt = bcrypt.gensalt(rounds=int(rounds or 12))
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('ascii')
+    return generate_password_hash(password, method=method)
+
+def _check(password_hash, password):
+    if password_hash.startswith('$2'):
+        import bcrypt
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+def _method_prefix(state):
+    # Everything before the salt: e.g. 'pbkdf2:sha256:600000$' or '$2b$12$'
+    if state.prefix is None:
+        sample = _hash('', state.method)
+        if sample.startswith('$2'):
+            state.prefix = sample[:7]
+        else:
+            state.prefix = sample.split('$', 1)[0] + '$'
+    return state.prefix
+
+def _verify(state, password_hash, password):
+    if not _check(password_hash, password):
+        return False, None
+    if password_hash.startswith(_method_prefix(state)):
+        return True, None
+    return True, _hash(password, state.method)
@@ -0,0 +1,262 @@
+import itertools
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy.engine import make_url
+
+# Orders in these statuses are not counted as sales (revenue, items, top sellers)
+NON_SALE_STATUSES = ('cancelled',)
+
+def counts_as_sale(status):
+    return status not in NON_SALE_STATUSES
+
+def day_bucket(created_at):
+    return created_at.date()
+
+def hour_bucket(created_at):
+    return created_at.replace(minute=0, second=0, microsecond=0)
+
+def _rollup_models():
+    from app.models import DailySales, HourlySales, MenuItemDailySales, DailyOrderStatus
+    return DailySales, HourlySales, MenuItemDailySales, DailyOrderStatus
+
+class _Deltas:
+    """Rollup increments, merged per rollup row so each row is written once."""
+
+    def __init__(self):
+        self.rows = {model: {} for model in _rollup_models()}
+
+    def add(self, model, key, **counters):
+        row = self.rows[model].setdefault(key, dict.fromkeys(counters, 0))
+        for name, value in counters.items():
+            row[name] += value
+
+    def add_sale(self, created_at, lines, sign):
+        # ``lines`` are (menu_item_id, quantity, revenue), one per menu item
+        DailySales, HourlySales, MenuItemDailySales, _ = _rollup_models()
+        quantity = sum(line[1] for line in lines)
+        revenue = sum(line[2] for line in lines)
+        day = day_bucket(created_at)
+        self.add(DailySales, (day,), order_count=sign, item_count=sign * quantity, revenue=sign * revenue)
+        self.add(HourlySales, (hour_bucket(created_at),), order_count=sign, item_count=sign * quantity, revenue=sign * revenue)
+        for menu_item_id, item_quantity, item_revenue in lines:
+            self.add(MenuItemDailySales, (day, menu_item_id), quantity=sign * item_quantity, revenue=sign * item_revenue)
+
+    def add_status(self, created_at, status, sign):
+        self.add(_rollup_models()[3], (day_bucket(created_at), status), order_count=sign)
+
+    def as_rows(self, model):
+        keys = [column.name for column in model.__table__.primary_key.columns]
+        return [
+            {**dict(zip(keys, key)), **counters}
+            for key, counters in self.rows[model].items()
+            if any(counters.values())
+        ]
+
+# Databases whose dialect offers INSERT ... ON CONFLICT, which the rollups and counters are written with
+UPSERT_DIALECTS = ('sqlite', 'postgresql')
+
+def check_upsert_support(app, feature):
+    """Raise ``ValueError`` at startup if the configured database cannot run the upserts."""
+    backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend not in UPSERT_DIALECTS:
+        raise ValueError(f"{feature} need INSERT ... ON CONFLICT, which the '{backend}' database does not support. "
+                         f"Expected one of: {', '.join(UPSERT_DIALECTS)}")
+
+def _dialect_insert(session):
+    # Only reached for the dialects check_upsert_support accepted when the app was created
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def _write(session, deltas):
+    # One upsert executemany per rollup table: counters are added to existing rows
+    insert = _dialect_insert(session)
+    for model in _rollup_models():
+        rows = deltas.as_rows(model)
+        if not rows:
+            continue
+        table = model.__table__
+        keys = [column.name for column in table.primary_key.columns]
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column.name: column + statement.excluded[column.name] for column in table.columns if column.name not in keys}
+        )
+        session.execute(statement, rows)
+
+class SalesRollups:
+    """Daily/hourly sales, per-item sales and per-status order counts.
+
+    Order flows report what they changed and the rollups are adjusted with
+    upserts inside the same transaction, so reports never aggregate the raw
+    order tables and can never count an order that was rolled back. The
+    ``sales-rollups`` CLI recomputes everything from the raw tables to rebuild
+    or check for drift.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        check_upsert_support(app, 'Sales rollups')
+        app.cli.add_command(rollups_cli)
+
+    def record_orders(self, session, orders):
+        """Count new orders; ``orders`` are ``(created_at, status, lines)`` tuples."""
+        deltas = _Deltas()
+        for created_at, status, lines in orders:
+            if counts_as_sale(status):
+                deltas.add_sale(created_at, lines, 1)
+            deltas.add_status(created_at, status, 1)
+        _write(session, deltas)
+
+    def record_status_change(self, session, created_at, previous_status, new_status, lines=()):
+        """Move an order between status counts.
+
+        ``lines`` are only needed when the order enters or leaves the sales,
+        e.g. when it is cancelled.
+        """
+        deltas = _Deltas()
+        deltas.add_status(created_at, previous_status, -1)
+        deltas.add_status(created_at, new_status, 1)
+        if counts_as_sale(previous_status) != counts_as_sale(new_status):
+            deltas.add_sale(created_at, lines, 1 if counts_as_sale(new_status) else -1)
+        _write(session, deltas)
+
+    def report(self, start_date, end_date, granularity='day', top=10):
+        """Sales between ``start_date`` and ``end_date`` (inclusive dates), from the rollups only."""
+        from app import db
+        from app.models import MenuItem
+        DailySales, HourlySales, MenuItemDailySales, DailyOrderStatus = _rollup_models()
+        if granularity == 'hour':
+            model, bucket = HourlySales, HourlySales.hour
+            in_range = bucket.between(datetime.combine(start_date, datetime.min.time()),
+                                      datetime.combine(end_date, datetime.min.time()) + timedelta(hours=23))
+        else:
+            model, bucket = DailySales, DailySales.day
+            in_range = bucket.between(start_date, end_date)
+        series = [
+            {'period': period.isoformat(), 'orders': orders, 'items': items, 'revenue': round(revenue, 2)}
+            for period, orders, items, revenue in db.session.execute(
+                db.select(bucket, model.order_count, model.item_count, model.revenue)
+                .where(in_range, model.order_count != 0)
+                .order_by(bucket)
+            )
+        ]
+
+        statuses = db.session.execute(
+            db.select(DailyOrderStatus.status, db.func.sum(DailyOrderStatus.order_count))
+            .where(DailyOrderStatus.day.between(start_date, end_date))
+            .group_by(DailyOrderStatus.status)
+        )
+
+        quantity = db.func.sum(MenuItemDailySales.quantity)
+        top_items = db.session.execute(
+            db.select(MenuItemDailySales.menu_item_id, MenuItem.name, quantity, db.func.sum(MenuItemDailySales.revenue))
+            .outerjoin(MenuItem, MenuItem.id == MenuItemDailySales.menu_item_id)
+            .where(MenuItemDailySales.day.between(start_date, end_date))
+            .group_by(MenuItemDailySales.menu_item_id, MenuItem.name)
+            .having(quantity > 0)
+            .order_by(quantity.desc(), MenuItemDailySales.menu_item_id)
+            .limit(top)
+        )
+
+        return {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'granularity': 'hour' if granularity == 'hour' else 'day',
+            'totals': {
+                'orders': sum(row['orders'] for row in series),
+                'items': sum(row['items'] for row in series),
+                'revenue': round(sum(row['revenue'] for row in series), 2),
+            },
+            'series': series,
+            'status_counts': {status: int(count) for status, count in statuses if count},
+            'top_items': [
+                {'menu_item_id': menu_item_id, 'name': name, 'quantity': int(item_quantity), 'revenue': round(revenue, 2)}
+                for menu_item_id, name, item_quantity, revenue in top_items
+            ],
+        }
+
+    def compute_from_orders(self):
+        """Recompute every rollup row from the raw ``order``/``order_item`` tables."""
+        from app import db
+        from app.models import Order, OrderItem
+        rows = db.session.execute(
+            db.select(Order.id, Order.created_at, Order.status, OrderItem.menu_item_id,
+                      db.func.sum(OrderItem.quantity), db.func.sum(OrderItem.quantity * OrderItem.price))
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .where(Order.created_at.is_not(None))
+            .group_by(Order.id, Order.created_at, Order.status, OrderItem.menu_item_id)
+            .order_by(Order.id)
+            .execution_options(yield_per=1000)
+        )
+        deltas = _Deltas()
+        for _, order_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            order_rows = list(order_rows)
+            _, created_at, status = order_rows[0][:3]
+            if counts_as_sale(status):
+                lines = [(row[3], int(row[4]), row[5]) for row in order_rows if row[3] is not None]
+                deltas.add_sale(created_at, lines, 1)
+            deltas.add_status(created_at, status, 1)
+        return deltas
+
+    def rebuild(self):
+        """Replace the rollups with values recomputed from the raw tables."""
+        from app import db
+        deltas = self.compute_from_orders()
+        for model in _rollup_models():
+            db.session.execute(db.delete(model))
+            rows = deltas.as_rows(model)
+            if rows:
+                db.session.execute(db.insert(model), rows)
+        db.session.commit()
+
+    def check(self):
+        """Compare the stored rollups with a recomputation; return the drifting rows."""
+        from app import db
+        expected = self.compute_from_orders()
+        mismatches = []
+        for model in _rollup_models():
+            keys = [column.name for column in model.__table__.primary_key.columns]
+            stored = {
+                tuple(row[key] for key in keys): {name: value for name, value in row.items() if name not in keys}
+                for row in db.session.execute(db.select(model.__table__)).mappings()
+            }
+            wanted = {tuple(row[key] for key in keys): {name: value for name, value in row.items() if name not in keys}
+                      for row in expected.as_rows(model)}
+            for key in sorted(set(stored) | set(wanted), key=str):
+                have, want = stored.get(key), wanted.get(key)
+                if have is not None and not any(have.values()):
+                    have = None # Rows that went back to zero are equivalent to missing ones
+                if not _same_counters(have, want):
+                    mismatches.append({'table': model.__tablename__, 'key': dict(zip(keys, map(str, key))),
+                                       'stored': have, 'expected': want})
+        return mismatches
+
+def _same_counters(have, want):
+    if have is None or want is None:
+        return have is None and want is None
+    return all(abs((have.get(name) or 0) - value) < 1e-6 for name, value in want.items())
+
+rollups_cli = AppGroup('sales-rollups', help='Maintain the sales reporting rollups.')
+
+@rollups_cli.command('rebuild')
+def rebuild_command():
+    """Recompute every rollup from the order tables."""
+    SalesRollups().rebuild()
+    click.echo('Sales rollups rebuilt.')
+
+@rollups_cli.command('check')
+def check_command():
+    """Compare the rollups with the order tables; exits non-zero on drift."""
+    mismatches = SalesRollups().check()
+    for mismatch in mismatches:
+        click.echo(f"{mismatch['table']}\t{mismatch['key']}\tstored={mismatch['stored']}\texpected={mismatch['expected']}")
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rollup row(s) disagree with the order tables')
+    click.echo('Sales rollups match the order tables.')
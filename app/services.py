@@ -1,10 +1,92 @@
-from app.models import MenuItem, Order, OrderItem
-from app import db
+from datetime import datetime
+from flask import current_app
+from app.models import User, MenuItem, Order, OrderItem
+from app import db, low_stock_monitor, order_counters, order_events, sales_rollups, stock_ledger
+
+# Order state machine: each status and the statuses it may move to
+ORDER_STATUS_TRANSITIONS = {
+    'pending': ('processing', 'cancelled'),
+    'processing': ('ready_for_delivery', 'completed', 'cancelled'),
+    'ready_for_delivery': ('completed', 'cancelled'),
+    'completed': (), # Cannot change once completed
+    'cancelled': (), # Cannot change once cancelled
+}
+# The inverse: the statuses each status may be reached from, i.e. the WHERE clause of a transition
+ORDER_STATUS_SOURCES = {
+    status: tuple(source for source, targets in ORDER_STATUS_TRANSITIONS.items() if status in targets)
+    for status in ORDER_STATUS_TRANSITIONS
+}
+
+class InsufficientStockError(ValueError):
+    """Raised when a conditional stock decrement could not be applied."""
+
+    def __init__(self, message, failed_items):
+        super().__init__(message)
+        self.failed_items = failed_items # {item_id: requested quantity}
+
+class OrderValidationError(ValueError):
+    """Raised when an order request is malformed; detected before any database access."""
+
+def _is_positive_int(value):
+    # bool is an int subclass, but true/false are not ids or quantities
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
 
 class OrderService:
     @staticmethod
-    def check_stock(item_id, quantity):
-        menu_item = db.session.get(MenuItem, item_id)
+    def validate_order(user_id, items_data, max_lines=None, max_quantity=None):
+        """Check an order request's shape and ranges and coalesce its lines.
+
+        Runs entirely in memory, so a malformed request is rejected without a
+        single query. Lines for the same ``item_id`` are merged into one,
+        keeping the order in which items first appear, so the stock checks,
+        reservations and ``OrderItem`` rows that follow see each menu item
+        once. Limits default to ``ORDER_MAX_LINES`` and ``ORDER_MAX_QUANTITY``.
+        Returns the coalesced items list; raises ``OrderValidationError``.
+        """
+        if max_lines is None:
+            max_lines = current_app.config['ORDER_MAX_LINES']
+        if max_quantity is None:
+            max_quantity = current_app.config['ORDER_MAX_QUANTITY']
+
+        if not user_id:
+            raise OrderValidationError('User ID is required')
+        if not _is_positive_int(user_id):
+            raise OrderValidationError('User ID must be a positive integer')
+        if not items_data or not isinstance(items_data, list):
+            raise OrderValidationError('Items data (list of item_id and quantity) is required')
+        if len(items_data) > max_lines:
+            raise OrderValidationError(f'An order may contain at most {max_lines} lines')
+
+        quantities = {}
+        for item_data in items_data:
+            if not isinstance(item_data, dict) or 'item_id' not in item_data or 'quantity' not in item_data:
+                raise OrderValidationError('Each item requires an item_id and a quantity')
+            item_id = item_data['item_id']
+            quantity = item_data['quantity']
+            if not _is_positive_int(item_id):
+                raise OrderValidationError(f'Invalid item_id {item_id!r}: must be a positive integer')
+            if not _is_positive_int(quantity) or quantity > max_quantity:
+                raise OrderValidationError(f'Invalid quantity for item {item_id}: must be an integer between 1 and {max_quantity}')
+            quantities[item_id] = quantities.get(item_id, 0) + quantity
+            if quantities[item_id] > max_quantity:
+                raise OrderValidationError(f'Total quantity for item {item_id} may not exceed {max_quantity}')
+        return [{'item_id': item_id, 'quantity': quantity} for item_id, quantity in quantities.items()]
+
+    @staticmethod
+    def load_menu_items(item_ids):
+        # Fetch every requested MenuItem in a single IN query, keyed by id
+        item_ids = set(item_ids)
+        if not item_ids:
+            return {}
+        menu_items = MenuItem.query.filter(MenuItem.id.in_(item_ids)).all()
+        return {menu_item.id: menu_item for menu_item in menu_items}
+
+    @staticmethod
+    def check_stock(item_id, quantity, menu_items=None):
+        if menu_items is None:
+            menu_item = db.session.get(MenuItem, item_id)
+        else:
+            menu_item = menu_items.get(item_id)
         if not menu_item:
             raise ValueError(f"MenuItem with ID {item_id} not found.")
         if menu_item.stock < quantity:
@@ -12,52 +94,332 @@ class OrderService:
         return True, None
 
     @staticmethod
-    def calculate_order_total(items_data):
+    def calculate_order_total(items_data, menu_items=None):
+        if menu_items is None:
+            menu_items = OrderService.load_menu_items(item_data['item_id'] for item_data in items_data)
         total_amount = 0.0
         for item_data in items_data:
             item_id = item_data['item_id']
             quantity = item_data['quantity']
-            menu_item = db.session.get(MenuItem, item_id)
+            menu_item = menu_items.get(item_id)
             if not menu_item:
                 raise ValueError(f"MenuItem with ID {item_id} not found for total calculation.")
             total_amount += menu_item.price * quantity
         return total_amount
 
+    @staticmethod
+    def aggregate_quantities(items_data):
+        # Sum requested quantities per menu item so each item is decremented once
+        quantities = {}
+        for item_data in items_data:
+            item_id = item_data['item_id']
+            quantities[item_id] = quantities.get(item_id, 0) + item_data['quantity']
+        return quantities
+
+    @staticmethod
+    def sale_lines(items_data, menu_items):
+        # (menu_item_id, quantity, revenue) per menu item, as the sales rollups expect
+        lines = {}
+        for item_data in items_data:
+            item_id = item_data['item_id']
+            quantity, revenue = lines.get(item_id, (0, 0.0))
+            lines[item_id] = (quantity + item_data['quantity'], revenue + menu_items[item_id].price * item_data['quantity'])
+        return [(item_id, quantity, revenue) for item_id, (quantity, revenue) in lines.items()]
+
+    @staticmethod
+    def reserve_stock(quantities):
+        """Atomically decrement stock for every item in ``quantities``.
+
+        Each decrement is a conditional ``UPDATE ... WHERE stock >= quantity``,
+        so concurrent orders can never drive stock below zero. Returns the
+        ``{item_id: quantity}`` entries that could not be reserved; the caller
+        is responsible for rolling back when that mapping is not empty.
+        """
+        failed_items = {}
+        for item_id, quantity in quantities.items():
+            reserved = db.session.execute(
+                db.update(MenuItem)
+                .where(MenuItem.id == item_id, MenuItem.stock >= quantity)
+                .values(stock=MenuItem.stock - quantity)
+                .returning(MenuItem.name, MenuItem.stock, MenuItem.low_stock_threshold)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if reserved is None:
+                failed_items[item_id] = quantity
+                continue
+            # The returned stock is exact even under concurrency, so threshold crossings are too
+            low_stock_monitor.observe(db.session, item_id, reserved.name, reserved.stock + quantity,
+                                      reserved.stock, reserved.low_stock_threshold)
+        return failed_items
+
+    @staticmethod
+    def restore_stock(quantities, order_id=None):
+        """Put ``{item_id: quantity}`` back in stock with one executemany ``UPDATE``.
+
+        Each menu item gets a single ``stock = stock + quantity`` statement and
+        all of them go to the database in one round trip, however many items
+        there are. The restored movements are ledgered as ``'cancel'``.
+        """
+        menu_item = MenuItem.__table__
+        db.session.execute(
+            menu_item.update()
+            .where(menu_item.c.id == db.bindparam('item_id'))
+            .values(stock=menu_item.c.stock + db.bindparam('quantity')),
+            [{'item_id': item_id, 'quantity': quantity} for item_id, quantity in quantities.items()]
+        )
+        restored = db.session.execute(
+            db.select(MenuItem.id, MenuItem.name, MenuItem.stock, MenuItem.low_stock_threshold)
+            .where(MenuItem.id.in_(quantities))
+        )
+        for item_id, name, stock, threshold in restored:
+            quantity = quantities[item_id]
+            low_stock_monitor.observe(db.session, item_id, name, stock - quantity, stock, threshold)
+            stock_ledger.record(db.session, item_id, quantity, 'cancel', order_id)
+
+    @staticmethod
+    def change_status(order_id, new_status, expected_status=None):
+        """Move an order to ``new_status`` with a single conditional UPDATE.
+
+        The ``WHERE`` clause only matches while the order is in a status that
+        may move to ``new_status`` (or exactly ``expected_status`` when given),
+        so of two racing changes only the first applies and nothing is read
+        beforehand. The same statement copies the old status into
+        ``previous_status``. Cancelling also restores the stock of the order's
+        items. An event for the order's streams is written in the same
+        transaction. Returns the order's ``(user_id, created_at, previous_status)``
+        once committed, or ``None`` (after rolling back) when no row matched.
+        """
+        sources = ORDER_STATUS_SOURCES.get(new_status, ())
+        if expected_status is not None:
+            sources = tuple(source for source in sources if source == expected_status)
+        if not sources:
+            return None
+
+        changed = db.session.execute(
+            db.update(Order)
+            .where(Order.id == order_id, Order.status.in_(sources))
+            .values(status=new_status, previous_status=Order.status) # SET reads the row as it was
+            .returning(Order.user_id, Order.created_at, Order.previous_status)
+        ).one_or_none()
+        if changed is None:
+            db.session.rollback()
+            return None
+
+        if new_status == 'cancelled':
+            lines = db.session.execute(
+                db.select(OrderItem.menu_item_id, db.func.sum(OrderItem.quantity), db.func.sum(OrderItem.quantity * OrderItem.price))
+                .where(OrderItem.order_id == order_id)
+                .group_by(OrderItem.menu_item_id)
+            ).all()
+            if lines:
+                OrderService.restore_stock({menu_item_id: quantity for menu_item_id, quantity, _ in lines}, order_id)
+            sales_rollups.record_status_change(db.session, changed.created_at, changed.previous_status, new_status, lines)
+        else:
+            sales_rollups.record_status_change(db.session, changed.created_at, changed.previous_status, new_status)
+        order_counters.record(db.session, {changed.previous_status: -1, new_status: 1})
+        order_events.publish(db.session, order_id, {
+            'order_id': order_id,
+            'user_id': changed.user_id,
+            'status': new_status,
+            'previous_status': changed.previous_status,
+            'changed_at': datetime.utcnow().isoformat()
+        })
+        db.session.commit()
+        return changed
+
+    @staticmethod
+    def cancel_order(order_id, expected_status=None):
+        """Cancel an order and restore the stock of its items in one transaction.
+
+        When two callers cancel the same order only one of them matches a row
+        and restores stock. Returns ``False`` when the order could not be
+        cancelled (or was no longer in ``expected_status``).
+        """
+        return OrderService.change_status(order_id, 'cancelled', expected_status) is not None
+
     @staticmethod
     def create_order(user_id, items_data):
+        # Validate and coalesce first; a no-op for items that were already validated
+        items_data = OrderService.validate_order(user_id, items_data)
+
+        # Load every requested menu item up front; all later steps read from this map
+        menu_items = OrderService.load_menu_items(item_data['item_id'] for item_data in items_data)
+
         # First, perform stock checks for all items
         for item_data in items_data:
             item_id = item_data['item_id']
             quantity = item_data['quantity']
-            in_stock, message = OrderService.check_stock(item_id, quantity)
+            in_stock, message = OrderService.check_stock(item_id, quantity, menu_items)
             if not in_stock:
                 raise ValueError(message)
-        
+
         # Calculate total amount
-        total_amount = OrderService.calculate_order_total(items_data)
+        total_amount = OrderService.calculate_order_total(items_data, menu_items)
 
-        # Create the order
-        order = Order(user_id=user_id)
-        db.session.add(order)
-        db.session.flush() # Flush to get the order.id for order items
+        # Reserve stock with conditional decrements; the checks above only fail fast,
+        # this is what guarantees no overselling when orders race each other
+        failed_items = OrderService.reserve_stock(OrderService.aggregate_quantities(items_data))
+        if failed_items:
+            names = ', '.join(menu_items[item_id].name for item_id in failed_items)
+            db.session.rollback()
+            raise InsufficientStockError(f"Not enough stock for {names}. Stock changed while the order was being placed.", failed_items)
+
+        order = OrderService.add_order(user_id, items_data, menu_items, total_amount)
+        db.session.flush() # Flush to get the order.id for the stock ledger
+        for item_id, quantity in OrderService.aggregate_quantities(items_data).items():
+            stock_ledger.record(db.session, item_id, -quantity, 'order', order.id)
+        sales_rollups.record_orders(db.session, [
+            (order.created_at, order.status, OrderService.sale_lines(items_data, menu_items))
+        ])
+        order_counters.record(db.session, {order.status: 1})
+
+        db.session.commit()
+        return order, total_amount
 
-        # Create order items and update stock
+    @staticmethod
+    def add_order(user_id, items_data, menu_items, total_amount=None):
+        # Stage an order and its items in the session; stock must already be reserved
+        if total_amount is None:
+            total_amount = OrderService.calculate_order_total(items_data, menu_items)
+        order = Order(
+            user_id=user_id,
+            total_amount=total_amount,
+            item_count=sum(item_data['quantity'] for item_data in items_data)
+        )
+        db.session.add(order)
         for item_data in items_data:
-            item_id = item_data['item_id']
-            quantity = item_data['quantity']
-            menu_item = db.session.get(MenuItem, item_id) # Re-fetch to be safe
-            
-            order_item = OrderItem(
-                order_id=order.id,
-                menu_item_id=item_id,
-                quantity=quantity,
-                price=menu_item.price # Store price at time of order
-            )
-            db.session.add(order_item)
-            
-            # Decrease stock
-            menu_item.stock -= quantity
-            db.session.add(menu_item) # Mark for update
+            db.session.add(OrderItem(
+                order=order,
+                menu_item_id=item_data['item_id'],
+                quantity=item_data['quantity'],
+                price=menu_items[item_data['item_id']].price # Store price at time of order
+            ))
+        return order
+
+    @staticmethod
+    def create_orders_bulk(orders_data, chunk_size=None, max_attempts=3):
+        """Create many orders with set-based lookups and one transaction per chunk.
+
+        Users and menu items for a chunk are loaded with one ``IN`` query each,
+        stock is checked in memory and then reserved with a single conditional
+        decrement per distinct item. An order that fails validation or stock
+        checks is rejected on its own without affecting the rest of its chunk.
+        If a concurrent order wins the race for stock, the chunk is rolled back
+        and retried against fresh stock. If a chunk fails for any other reason
+        (e.g. the database is locked), only its orders are reported as failed:
+        earlier chunks are already committed and later ones are still tried.
+        Returns one result dict per order, in request order.
+        """
+        results = [None] * len(orders_data)
+        chunk_size = chunk_size or len(orders_data) or 1
+        for start in range(0, len(orders_data), chunk_size):
+            chunk = list(enumerate(orders_data[start:start + chunk_size], start))
+            try:
+                for attempt in range(max_attempts):
+                    if OrderService._create_orders_chunk(chunk, results):
+                        break
+                else:
+                    OrderService._fail_chunk(chunk, results, 'Stock changed while the orders were being placed. Please retry.')
+            except Exception as e:
+                db.session.rollback()
+                OrderService._fail_chunk(chunk, results, f'The order could not be saved: {e}. Please retry.')
+        return results
+
+    @staticmethod
+    def _fail_chunk(chunk, results, message):
+        # Orders already rejected keep their own reason; none of the chunk was committed
+        for index, _ in chunk:
+            if results[index] is None:
+                results[index] = {'index': index, 'success': False, 'message': message}
+
+    @staticmethod
+    def _create_orders_chunk(chunk, results):
+        valid = []
+        for index, order_data in chunk:
+            try:
+                if not isinstance(order_data, dict):
+                    raise OrderValidationError('User ID is required')
+                items_data = OrderService.validate_order(order_data.get('user_id'), order_data.get('items'))
+            except OrderValidationError as e:
+                results[index] = {'index': index, 'success': False, 'message': str(e)}
+            else:
+                valid.append((index, order_data['user_id'], items_data))
+
+        user_ids = {user_id for _, user_id, _ in valid}
+        known_users = set(db.session.execute(db.select(User.id).where(User.id.in_(user_ids))).scalars()) if user_ids else set()
+        menu_items = OrderService.load_menu_items(item_data['item_id'] for _, _, items_data in valid for item_data in items_data)
+
+        # Check stock in memory, in request order, against what earlier orders in the chunk already took
+        remaining = {item_id: menu_item.stock for item_id, menu_item in menu_items.items()}
+        accepted = []
+        for index, user_id, items_data in valid:
+            if user_id not in known_users:
+                results[index] = {'index': index, 'success': False, 'message': f'User with ID {user_id} not found'}
+                continue
+            try:
+                quantities = OrderService.aggregate_quantities(items_data)
+                for item_id, quantity in quantities.items():
+                    menu_item = menu_items.get(item_id)
+                    if not menu_item:
+                        raise ValueError(f"MenuItem with ID {item_id} not found.")
+                    if remaining[item_id] < quantity:
+                        raise ValueError(f"Not enough stock for {menu_item.name}. Available: {remaining[item_id]}, Requested: {quantity}")
+                total_amount = OrderService.calculate_order_total(items_data, menu_items)
+            except ValueError as e:
+                results[index] = {'index': index, 'success': False, 'message': str(e)}
+                continue
+            for item_id, quantity in quantities.items():
+                remaining[item_id] -= quantity
+            accepted.append((index, user_id, items_data, total_amount))
+
+        if not accepted:
+            return True
+
+        chunk_quantities = {}
+        for _, _, items_data, _ in accepted:
+            for item_id, quantity in OrderService.aggregate_quantities(items_data).items():
+                chunk_quantities[item_id] = chunk_quantities.get(item_id, 0) + quantity
+        if OrderService.reserve_stock(chunk_quantities):
+            db.session.rollback()
+            for index, _, _, _ in accepted:
+                results[index] = None
+            return False
 
+        # Insert orders, then every line item of the chunk in a single executemany
+        inserted = db.session.execute(
+            db.insert(Order).returning(Order.id, Order.created_at, Order.status, sort_by_parameter_order=True),
+            [
+                {
+                    'user_id': user_id,
+                    'total_amount': total_amount,
+                    'item_count': sum(item_data['quantity'] for item_data in items_data)
+                }
+                for _, user_id, items_data, total_amount in accepted
+            ]
+        ).all()
+        order_ids = [row.id for row in inserted]
+        db.session.execute(db.insert(OrderItem), [
+            {
+                'order_id': order_id,
+                'menu_item_id': item_data['item_id'],
+                'quantity': item_data['quantity'],
+                'price': menu_items[item_data['item_id']].price # Store price at time of order
+            }
+            for order_id, (_, _, items_data, _) in zip(order_ids, accepted)
+            for item_data in items_data
+        ])
+        for order_id, (_, _, items_data, _) in zip(order_ids, accepted):
+            for item_id, quantity in OrderService.aggregate_quantities(items_data).items():
+                stock_ledger.record(db.session, item_id, -quantity, 'order', order_id)
+        sales_rollups.record_orders(db.session, [
+            (row.created_at, row.status, OrderService.sale_lines(items_data, menu_items))
+            for row, (_, _, items_data, _) in zip(inserted, accepted)
+        ])
+        new_orders = {}
+        for row in inserted:
+            new_orders[row.status] = new_orders.get(row.status, 0) + 1
+        order_counters.record(db.session, new_orders)
         db.session.commit()
-        return order, total_amount
\ No newline at end of file
+        for order_id, (index, _, _, total_amount) in zip(order_ids, accepted):
+            results[index] = {'index': index, 'success': True, 'order_id': order_id, 'total_amount': total_amount}
+        return True
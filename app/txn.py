@@ -0,0 +1,19 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+def on_commit(session, callback):
+    """Run ``callback()`` after ``session`` commits; drop it if the session rolls back.
+
+    Used for side effects (buffers, caches, notifications) that must only see
+    data which is actually durable.
+    """
+    session.info.setdefault('on_commit', []).append(callback)
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(session):
+    for callback in session.info.pop('on_commit', ()):
+        callback()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('on_commit', None)
@@ -0,0 +1,63 @@
+"""Compare bulk order intake through POST /api/v1/orders/batch with looping over
+POST /api/v1/orders, on a file-backed SQLite database.
+
+Usage: python -m benchmarks.bulk_orders [--orders 500] [--chunk-size 100]
+"""
+import argparse
+import json
+import random
+import time
+from benchmarks.common import dispose_app, make_app, seed_dataset
+
+def make_orders(count, users, menu_items, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'user_id': rng.randint(1, users),
+            'items': [{'item_id': item_id, 'quantity': rng.randint(1, 3)} for item_id in rng.sample(range(1, menu_items + 1), 3)]
+        }
+        for _ in range(count)
+    ]
+
+def timed(label, count, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    return {'label': label, 'orders': count, 'seconds': round(elapsed, 3), 'orders_per_s': round(count / elapsed, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders, users=100, menu_items=20)
+    results = []
+
+    app = make_app()
+    with app.app_context():
+        seed_dataset(users=100, menu_items=20)
+    client = app.test_client()
+
+    def loop():
+        for order in orders:
+            assert client.post('/api/v1/orders', json=order).status_code == 201
+    results.append(timed('single-order endpoint, looped', args.orders, loop))
+    dispose_app(app)
+
+    app = make_app()
+    with app.app_context():
+        seed_dataset(users=100, menu_items=20)
+    client = app.test_client()
+
+    def batch():
+        response = client.post('/api/v1/orders/batch', json={'orders': orders, 'chunk_size': args.chunk_size})
+        assert response.status_code == 201, response.get_json()
+    results.append(timed('batch endpoint', args.orders, batch))
+    dispose_app(app)
+
+    results.append({'speedup': round(results[1]['orders_per_s'] / results[0]['orders_per_s'], 1)})
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
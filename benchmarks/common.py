@@ -0,0 +1,83 @@
+"""Shared helpers for the benchmark scripts: throwaway apps and seeded datasets."""
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from app import create_app, db
+from app.models import User, MenuItem, Order, OrderItem
+
+STATUSES = ['pending', 'processing', 'ready_for_delivery', 'completed', 'cancelled']
+
+def make_app(db_path=None, **config):
+    # Every benchmark runs against its own file-backed SQLite database. Without a
+    # db_path it lives in a temporary directory owned by the app, removed by
+    # dispose_app (or at the latest when the interpreter exits)
+    workdir = None
+    if db_path is None:
+        workdir = tempfile.TemporaryDirectory(prefix='breakfast-bench-')
+        db_path = Path(workdir.name) / 'bench.db'
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        **config
+    })
+    app.extensions['benchmark_workdir'] = workdir
+    with app.app_context():
+        db.create_all()
+    return app
+
+def dispose_app(app):
+    """Close the app's connections and delete its temporary database, if it has one."""
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    workdir = app.extensions.pop('benchmark_workdir', None)
+    if workdir is not None:
+        workdir.cleanup()
+
+def seed_dataset(users=100, menu_items=20, orders=0, items_per_order=3, stock=1_000_000, seed=42):
+    """Bulk-insert a deterministic dataset; must run inside an app context."""
+    rng = random.Random(seed)
+    db.session.execute(db.insert(User), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+        for i in range(1, users + 1)
+    ])
+    db.session.execute(db.insert(MenuItem), [
+        {'name': f'Menu item {i}', 'description': f'Item {i}', 'price': float(rng.randint(20, 90)), 'stock': stock}
+        for i in range(1, menu_items + 1)
+    ])
+
+    now = datetime.utcnow()
+    batch = 5000
+    for offset in range(0, orders, batch):
+        count = min(batch, orders - offset)
+        order_rows = []
+        for i in range(count):
+            created_at = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+            order_rows.append({
+                'id': offset + i + 1,
+                'user_id': rng.randint(1, users),
+                'status': rng.choice(STATUSES),
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+        item_rows = [
+            {
+                'order_id': row['id'],
+                'menu_item_id': rng.randint(1, menu_items),
+                'quantity': rng.randint(1, 3),
+                'price': 35.0
+            }
+            for row in order_rows
+            for _ in range(items_per_order)
+        ]
+        for row in order_rows:
+            row['total_amount'] = 0.0
+            row['item_count'] = 0
+        rows_by_id = {row['id']: row for row in order_rows}
+        for item in item_rows:
+            row = rows_by_id[item['order_id']]
+            row['total_amount'] += item['price'] * item['quantity']
+            row['item_count'] += item['quantity']
+        db.session.execute(db.insert(Order), order_rows)
+        db.session.execute(db.insert(OrderItem), item_rows)
+    db.session.commit()
@@ -0,0 +1,87 @@
+"""Show EXPLAIN QUERY PLAN and timings for the admin order queries, before and after
+the composite indexes added in migration 4b8e2f1a9c3d.
+
+Usage: python -m benchmarks.explain_admin_queries [--orders 200000]
+"""
+import argparse
+import time
+from contextlib import contextmanager
+from werkzeug.datastructures import MultiDict
+from app import db
+from app.api.admin import apply_order_filters, order_list_query
+from app.models import Order, OrderItem
+from benchmarks.common import dispose_app, make_app, seed_dataset
+
+NEW_INDEXES = [
+    'ix_order_status_created_at',
+    'ix_order_user_id_created_at',
+    'ix_order_item_order_id',
+    'ix_order_item_menu_item_id',
+]
+
+def admin_queries():
+    # The same statements AdminOrdersResource issues for typical console filters
+    def page(**args):
+        return apply_order_filters(order_list_query(), MultiDict(args)).order_by(Order.created_at.desc()).limit(20).statement
+
+    def count(**args):
+        return apply_order_filters(order_list_query(), MultiDict(args)).order_by(None).statement.with_only_columns(db.func.count())
+
+    return [
+        ('status page', page(status='pending')),
+        ('status count', count(status='pending')),
+        ('user page', page(user_id='42')),
+        ('status + date range page', page(status='completed', start_date='2026-03-01', end_date='2026-03-31')),
+        ('order items for page', db.select(OrderItem).where(OrderItem.order_id.in_(range(1000, 1020)))),
+    ]
+
+@contextmanager
+def explain(connection):
+    def prefix(conn, cursor, statement, parameters, context, executemany):
+        return 'EXPLAIN QUERY PLAN ' + statement, parameters
+
+    db.event.listen(connection, 'before_cursor_execute', prefix, retval=True)
+    try:
+        yield
+    finally:
+        db.event.remove(connection, 'before_cursor_execute', prefix)
+
+def report(connection, label, repeat):
+    print(f'=== {label} ===')
+    for name, statement in admin_queries():
+        with explain(connection):
+            plan = [row.detail for row in connection.execute(statement, execution_options={'compiled_cache': None})]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            connection.execute(statement).all()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+        print(f'{name:<28} {elapsed_ms:8.2f} ms  | ' + ' / '.join(plan))
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        print(f'Seeding {args.orders} orders...')
+        seed_dataset(users=1000, orders=args.orders)
+        with db.engine.connect() as connection:
+            for name in NEW_INDEXES:
+                connection.exec_driver_sql(f'DROP INDEX {name}')
+            connection.exec_driver_sql('ANALYZE')
+            report(connection, 'before (created_at index only)', args.repeat)
+
+            for table in (Order.__table__, OrderItem.__table__):
+                for index in table.indexes:
+                    if index.name in NEW_INDEXES:
+                        index.create(connection)
+            connection.exec_driver_sql('ANALYZE')
+            report(connection, 'after (composite indexes)', args.repeat)
+            connection.commit()
+    dispose_app(app)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Load test the real HTTP endpoints and enforce the Regulations §3.1 P95 budgets.
+
+Starts ``create_app()`` against a seeded file-backed SQLite database, serves it on a
+loopback port and drives it with a configurable number of concurrent clients and a
+weighted request mix. Prints (or writes) a JSON report with p50/p95/p99 latency and
+throughput per endpoint, and exits non-zero when a budget is exceeded.
+
+Usage: python -m benchmarks.load_test [--concurrency 8] [--requests 2000]
+           [--mix menu=6,create_order=3,update_status=1] [--output results.json]
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import WSGIRequestHandler, make_server
+from app import db
+from app.models import Order
+from benchmarks.common import dispose_app, make_app, seed_dataset
+
+# P95 budgets in milliseconds, from .spec/Regulations.md §3.1
+BUDGETS_MS = {
+    'create_order': 1500, # POST /api/v1/orders
+    'update_status': 1500, # PUT /api/v1/orders/{id}/status
+    'menu': 3000, # GET /api/v1/menu
+}
+
+DEFAULT_MIX = {'menu': 6, 'create_order': 3, 'update_status': 1}
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log(self, type, message, *args):
+        pass
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in BUDGETS_MS:
+            raise argparse.ArgumentTypeError(f'Unknown endpoint in mix: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile; sorted_values must not be empty
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+class LoadTest:
+    def __init__(self, concurrency=8, total_requests=2000, mix=None, users=200, menu_items=20, seed=1, app_config=None):
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.mix = mix or DEFAULT_MIX
+        self.users = users
+        self.menu_items = menu_items
+        self.seed = seed
+        self.app_config = app_config or {}
+        self.pending_orders = deque()
+        self.samples = {name: [] for name in self.mix}
+        self.errors = {name: 0 for name in self.mix}
+        self.lock = threading.Lock()
+
+    def setup(self):
+        self.prepare_database()
+        self.start_server()
+
+    def prepare_database(self):
+        self.app = make_app(**self.app_config)
+        status_updates = int(self.total_requests * self.mix.get('update_status', 0) / sum(self.mix.values())) + 1
+        with self.app.app_context():
+            seed_dataset(users=self.users, menu_items=self.menu_items)
+            # Pending orders for the status-update share of the mix to advance
+            db.session.execute(db.insert(Order), [
+                {'user_id': (i % self.users) + 1, 'status': 'pending'} for i in range(status_updates)
+            ])
+            db.session.commit()
+            self.pending_orders.extend(db.session.execute(db.select(Order.id)).scalars())
+
+    def start_server(self):
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True, request_handler=_QuietRequestHandler)
+        self.port = self.server.server_port
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+
+    def stop_server(self):
+        self.server.shutdown()
+        self.server_thread.join()
+
+    def teardown(self):
+        self.stop_server()
+        dispose_app(self.app)
+
+    def request_for(self, name, rng):
+        if name == 'menu':
+            return 'GET', '/api/v1/menu', None, (200,)
+        if name == 'create_order':
+            items = [
+                {'item_id': item_id, 'quantity': rng.randint(1, 3)}
+                for item_id in rng.sample(range(1, self.menu_items + 1), rng.randint(1, 4))
+            ]
+            return 'POST', '/api/v1/orders', {'user_id': rng.randint(1, self.users), 'items': items}, (201,)
+        try:
+            order_id = self.pending_orders.popleft()
+        except IndexError:
+            order_id = 1 # Out of pending orders: still measures the "no change" path
+        return 'PUT', f'/api/v1/orders/{order_id}/status', {'status': 'processing'}, (200,)
+
+    def run_one(self, index):
+        rng = random.Random(self.seed * 1_000_003 + index)
+        name = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        method, path, payload, expected = self.request_for(name, rng)
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            ok = response.status in expected
+        except OSError:
+            ok = False
+        finally:
+            connection.close()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self.lock:
+            self.samples[name].append(elapsed_ms)
+            if not ok:
+                self.errors[name] += 1
+
+    def run(self):
+        self.setup()
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                list(executor.map(self.run_one, range(self.total_requests)))
+            duration = time.perf_counter() - started
+        finally:
+            self.teardown()
+        return self.report(duration)
+
+    def report(self, duration):
+        endpoints = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            endpoints[name] = {
+                'requests': len(ordered),
+                'errors': self.errors[name],
+                'throughput_rps': round(len(ordered) / duration, 2),
+                'mean_ms': round(sum(ordered) / len(ordered), 3),
+                'p50_ms': round(percentile(ordered, 50), 3),
+                'p95_ms': round(percentile(ordered, 95), 3),
+                'p99_ms': round(percentile(ordered, 99), 3),
+                'max_ms': round(ordered[-1], 3),
+                'budget_p95_ms': BUDGETS_MS[name],
+            }
+        return {
+            'config': {
+                'concurrency': self.concurrency,
+                'requests': self.total_requests,
+                'mix': self.mix,
+                'seed': self.seed,
+            },
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(self.total_requests / duration, 2),
+            'endpoints': endpoints,
+        }
+
+def check_budgets(results):
+    """Return a list of human-readable budget violations (empty when all pass)."""
+    violations = []
+    for name, stats in results['endpoints'].items():
+        if stats['p95_ms'] > stats['budget_p95_ms']:
+            violations.append(f"{name}: p95 {stats['p95_ms']}ms exceeds budget {stats['budget_p95_ms']}ms")
+        if stats['errors']:
+            violations.append(f"{name}: {stats['errors']} of {stats['requests']} requests failed")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='weighted endpoint mix, e.g. menu=6,create_order=3,update_status=1')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = LoadTest(args.concurrency, args.requests, args.mix, seed=args.seed).run()
+    results['violations'] = check_budgets(results)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+    for violation in results['violations']:
+        print(f'BUDGET EXCEEDED: {violation}', file=sys.stderr)
+    sys.exit(1 if results['violations'] else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Measure order-creation latency while a login storm verifies passwords.
+
+Runs the create-order load test three times: without logins, with a storm
+of login threads going through the bounded password hasher, and with the
+hasher effectively unbounded (one pool thread per login, as if every request
+thread hashed inline). Each login looks the user up and calls
+``User.check_password`` in the server process, like a login endpoint would.
+Reports order p50/p95/p99 and how many logins completed or were turned away.
+
+Usage: python -m benchmarks.login_storm [--logins 16] [--requests 600]
+           [--concurrency 8] [--method scrypt] [--workers 1]
+"""
+import argparse
+import json
+import os
+import threading
+from app import db
+from app.models import User
+from app.passwords import PasswordHashingBusy
+from benchmarks.load_test import LoadTest
+
+PASSWORD = 'correct horse battery staple'
+
+class LoginStormLoadTest(LoadTest):
+    def __init__(self, logins, **kwargs):
+        super().__init__(**kwargs)
+        self.logins = logins
+        self.stop_storm = threading.Event()
+        self.login_counts = {'completed': 0, 'busy': 0}
+
+    def prepare_database(self):
+        super().prepare_database()
+        with self.app.app_context():
+            user = User(username='storm', email='storm@example.com')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+            self.storm_user_id = user.id
+
+    def start_server(self):
+        super().start_server()
+        self.storm_threads = [threading.Thread(target=self.log_in_repeatedly, daemon=True) for _ in range(self.logins)]
+        for thread in self.storm_threads:
+            thread.start()
+
+    def log_in_repeatedly(self):
+        with self.app.app_context():
+            while not self.stop_storm.is_set():
+                try:
+                    db.session.get(User, self.storm_user_id).check_password(PASSWORD)
+                    outcome = 'completed'
+                except PasswordHashingBusy:
+                    outcome = 'busy'
+                db.session.remove()
+                with self.lock:
+                    self.login_counts[outcome] += 1
+
+    def stop_server(self):
+        self.stop_storm.set()
+        for thread in self.storm_threads:
+            thread.join()
+        super().stop_server()
+
+    def report(self, duration):
+        results = super().report(duration)
+        results['logins'] = {**self.login_counts, 'per_s': round(self.login_counts['completed'] / duration, 1)}
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=16, help='concurrent login threads in the storm')
+    parser.add_argument('--requests', type=int, default=600)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--method', default='scrypt', help='PASSWORD_HASH_METHOD, e.g. pbkdf2:sha256:600000 or bcrypt:12')
+    parser.add_argument('--workers', type=int, default=max((os.cpu_count() or 1) // 2, 1),
+                        help='PASSWORD_HASH_WORKERS for the bounded run (default: half the cores)')
+    args = parser.parse_args()
+
+    scenarios = {
+        'no_logins': (0, {}),
+        'bounded_hasher': (args.logins, {'PASSWORD_HASH_WORKERS': args.workers}),
+        'unbounded_hasher': (args.logins, {'PASSWORD_HASH_WORKERS': args.logins, 'PASSWORD_HASH_MAX_PENDING': args.logins * 4}),
+    }
+    report = {'method': args.method, 'logins': args.logins, 'cpu_count': os.cpu_count(), 'scenarios': {}}
+    for name, (logins, hasher_config) in scenarios.items():
+        results = LoginStormLoadTest(
+            logins, concurrency=args.concurrency, total_requests=args.requests, mix={'create_order': 1},
+            app_config={'PASSWORD_HASH_METHOD': args.method, **hasher_config}
+        ).run()
+        orders = results['endpoints']['create_order']
+        report['scenarios'][name] = {
+            'hasher': hasher_config,
+            'create_order': {key: orders[key] for key in ('p50_ms', 'p95_ms', 'p99_ms', 'errors')},
+            'logins': results['logins'],
+        }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Measure how throughput scales with the number of gunicorn workers.
+
+Runs the load test mix against the production entry point (``gunicorn -c
+gunicorn.conf.py``) once per worker count, each time on a freshly seeded
+file-backed database, and reports throughput, p95 latency and speedup over a
+single worker. Needs the ``server`` extra (gunicorn). The load generator runs
+in this process, so on small machines it can become the bottleneck before the
+server does; compare runs on the same host only.
+
+Usage: python -m benchmarks.server_scaling [--workers 1,2,4] [--threads 4]
+           [--concurrency 32] [--requests 4000] [--output results.json]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from benchmarks.load_test import DEFAULT_MIX, LoadTest, parse_mix
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class GunicornLoadTest(LoadTest):
+    """The load test, served by gunicorn worker processes instead of an in-process server."""
+
+    def __init__(self, workers, threads=4, **kwargs):
+        super().__init__(**kwargs)
+        self.workers = workers
+        self.threads = threads
+
+    def start_server(self):
+        self.port = free_port()
+        env = {
+            **os.environ,
+            'BREAKFAST_SQLALCHEMY_DATABASE_URI': self.app.config['SQLALCHEMY_DATABASE_URI'],
+            'BREAKFAST_BIND': f'127.0.0.1:{self.port}',
+            'BREAKFAST_WORKERS': str(self.workers),
+            'BREAKFAST_THREADS': str(self.threads),
+        }
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning'],
+            cwd=ROOT, env=env
+        )
+        self.wait_until_ready()
+
+    def wait_until_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with code {self.process.returncode}')
+            connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+            try:
+                connection.request('GET', '/api/v1/menu')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.1)
+        raise RuntimeError('gunicorn did not start serving in time')
+
+    def stop_server(self):
+        self.process.terminate()
+        self.process.wait(timeout=60)
+
+    def report(self, duration):
+        results = super().report(duration)
+        results['config'].update({'workers': self.workers, 'threads': self.threads})
+        return results
+
+def parse_counts(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+def default_worker_counts():
+    counts, workers = [], 1
+    while workers < multiprocessing.cpu_count():
+        counts.append(workers)
+        workers *= 2
+    return counts + [multiprocessing.cpu_count()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=parse_counts, default=default_worker_counts(),
+                        help='comma-separated worker counts (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    runs = []
+    for workers in args.workers:
+        results = GunicornLoadTest(workers, args.threads, concurrency=args.concurrency,
+                                   total_requests=args.requests, mix=args.mix).run()
+        runs.append({
+            'workers': workers,
+            'throughput_rps': results['throughput_rps'],
+            'p95_ms': {name: stats['p95_ms'] for name, stats in results['endpoints'].items()},
+            'errors': sum(stats['errors'] for stats in results['endpoints'].values()),
+        })
+    baseline = runs[0]['throughput_rps']
+    for run in runs:
+        run['speedup'] = round(run['throughput_rps'] / baseline, 2)
+
+    report = json.dumps({'cpu_count': multiprocessing.cpu_count(), 'threads': args.threads, 'runs': runs}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
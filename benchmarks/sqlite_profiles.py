@@ -0,0 +1,95 @@
+"""Compare the default and production SQLite engine profiles under concurrent load.
+
+Writer threads place orders through OrderService while reader threads list admin
+orders, both against the same file-backed database, for a fixed duration. Reports
+throughput, reader latency and "database is locked" failures per profile.
+
+Usage: python -m benchmarks.sqlite_profiles [--writers 8] [--readers 8] [--duration 10]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.api.admin import order_list_query, serialize_orders
+from app.models import Order
+from app.services import OrderService
+from benchmarks.common import dispose_app, make_app, seed_dataset
+from benchmarks.load_test import percentile
+
+def run_profile(profile, writers, readers, duration, orders):
+    app = make_app(DB_ENGINE_PROFILE=profile)
+    with app.app_context():
+        seed_dataset(users=200, menu_items=20, orders=orders)
+
+    counts = {'orders': 0, 'reads': 0, 'locked': 0}
+    read_latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def writer(index):
+        rng = random.Random(index)
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                items = [{'item_id': rng.randint(1, 20), 'quantity': 1} for _ in range(3)]
+                try:
+                    OrderService.create_order(rng.randint(1, 200), items)
+                    key = 'orders'
+                except OperationalError:
+                    db.session.rollback()
+                    key = 'locked'
+                with lock:
+                    counts[key] += 1
+            db.session.remove()
+
+    def reader(index):
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    serialize_orders(order_list_query().order_by(Order.created_at.desc()).limit(20).all())
+                    key = 'reads'
+                except OperationalError:
+                    db.session.rollback()
+                    key = 'locked'
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                db.session.remove()
+                with lock:
+                    counts[key] += 1
+                    read_latencies.append(elapsed_ms)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dispose_app(app)
+
+    read_latencies.sort()
+    return {
+        'orders_per_s': round(counts['orders'] / duration, 1),
+        'reads_per_s': round(counts['reads'] / duration, 1),
+        'locked_errors': counts['locked'],
+        'read_p50_ms': round(percentile(read_latencies, 50), 2) if read_latencies else None,
+        'read_p95_ms': round(percentile(read_latencies, 95), 2) if read_latencies else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--orders', type=int, default=20_000, help='orders seeded before the run')
+    args = parser.parse_args()
+
+    results = {
+        profile: run_profile(profile, args.writers, args.readers, args.duration, args.orders)
+        for profile in ('default', 'production')
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Measure how fast a fresh process can import the app, build it and serve a request.
+
+Each run starts a new interpreter (so nothing is cached in ``sys.modules``) which
+times ``from app import create_app``, ``create_app()`` and the first
+``GET /api/v1/menu`` against a seeded SQLite file. Runs are repeated for the
+``runtime`` and ``full`` app profiles; the report holds the median of each phase
+and the ``runtime`` medians are checked against ``BUDGETS_MS``, since that is
+what gunicorn workers load. Exits non-zero when a budget is exceeded.
+
+Usage: python -m benchmarks.startup_time [--runs 7] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from app import db
+from benchmarks.common import make_app, seed_dataset
+
+# Median milliseconds per phase for the runtime profile, with headroom for slow CI machines
+BUDGETS_MS = {
+    'import': 1500, # from app import create_app
+    'create_app': 500,
+    'first_request': 500, # GET /api/v1/menu, including mapper configuration
+    'process': 3000, # Interpreter start to first response, as a worker restart sees it
+}
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/api/v1/menu')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import': (imported - started) * 1000,
+    'create_app': (created - imported) * 1000,
+    'first_request': (served - created) * 1000,
+    'alembic_loaded': 'alembic' in sys.modules,
+}))
+'''
+
+def probe(profile, database_uri):
+    env = {**os.environ, 'BREAKFAST_APP_PROFILE': profile, 'BREAKFAST_SQLALCHEMY_DATABASE_URI': database_uri}
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', PROBE], env=env, cwd=Path(__file__).resolve().parent.parent,
+                               capture_output=True, text=True, check=True)
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['process'] = (time.perf_counter() - started) * 1000
+    return timings
+
+def run(runs=7, profiles=('runtime', 'full')):
+    with tempfile.TemporaryDirectory(prefix='breakfast-startup-') as workdir:
+        db_path = Path(workdir) / 'startup.db'
+        app = make_app(db_path)
+        with app.app_context():
+            seed_dataset(users=10, menu_items=20)
+            db.engine.dispose()
+
+        # Interleave the profiles so a warming disk cache does not favour whichever runs last
+        samples = {profile: [] for profile in profiles}
+        for _ in range(runs):
+            for profile in profiles:
+                samples[profile].append(probe(profile, f'sqlite:///{db_path}'))
+
+    results = {'config': {'runs': runs}, 'profiles': {}}
+    for profile, profile_samples in samples.items():
+        results['profiles'][profile] = {
+            **{f'{phase}_ms': round(statistics.median(sample[phase] for sample in profile_samples), 1) for phase in BUDGETS_MS},
+            'alembic_loaded': any(sample['alembic_loaded'] for sample in profile_samples),
+        }
+    results['violations'] = check_budgets(results)
+    return results
+
+def check_budgets(results):
+    """Return a list of human-readable budget violations (empty when all pass)."""
+    stats = results['profiles']['runtime']
+    violations = [
+        f"{phase}: median {stats[f'{phase}_ms']}ms exceeds the {budget}ms budget"
+        for phase, budget in BUDGETS_MS.items()
+        if stats[f'{phase}_ms'] > budget
+    ]
+    if stats['alembic_loaded']:
+        violations.append('runtime profile imported alembic')
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+    for violation in results['violations']:
+        print(f'BUDGET EXCEEDED: {violation}', file=sys.stderr)
+    sys.exit(1 if results['violations'] else 0)
+
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,10 @@ from app.models import User, MenuItem, Order, OrderItem
 def flask_app(context, timeout=30):
     # This fixture sets up the Flask app and an application context
     # It will run once per test run, and the app context will be pushed/popped per scenario
-    app = create_app()
-    app.config.update({
+    app = create_app({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", # Use in-memory SQLite for testing
+        "APP_PROFILE": "runtime", # No migrations needed
     })
     context.app = app
     context.client = app.test_client()
@@ -0,0 +1,64 @@
+"""Gunicorn settings for the production server.
+
+Run with ``gunicorn -c gunicorn.conf.py`` (``pip install .[server]``).
+Everything can be tuned through environment variables:
+
+- ``BREAKFAST_BIND`` (default ``0.0.0.0:8000``)
+- ``BREAKFAST_WORKERS`` worker processes (default: one per CPU core)
+- ``BREAKFAST_WORKER_CLASS`` ``gthread`` (default) or ``gevent``, see below
+- ``BREAKFAST_THREADS`` threads per gthread worker (default 4)
+- ``BREAKFAST_WORKER_CONNECTIONS`` open connections per gevent worker (default 1000)
+- ``BREAKFAST_TIMEOUT`` / ``BREAKFAST_GRACEFUL_TIMEOUT`` in seconds (default 30)
+- ``BREAKFAST_MAX_REQUESTS`` recycle a worker after this many requests (default 0, never)
+- ``BREAKFAST_APP_PROFILE`` (default ``runtime``, see ``APP_PROFILES`` in ``app``)
+
+Order event streams (``/api/v1/orders/<id>/events`` and
+``/api/v1/admin/orders/events``) stay open for minutes, which would tie up a
+gthread worker's threads. Serve those paths from a second instance started
+with ``BREAKFAST_WORKER_CLASS=gevent``, where an open stream costs a greenlet,
+and route them to it at the reverse proxy. The API itself stays on gthread
+workers, whose threads can wait on SQLite locks without stalling the rest.
+
+``kill -HUP <master>`` replaces the workers gracefully: old workers finish
+their in-flight requests (up to the graceful timeout) while new ones start.
+Because the app is preloaded, picking up new code needs ``USR2`` followed by
+``QUIT`` of the old master instead.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('BREAKFAST_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('BREAKFAST_WORKERS', multiprocessing.cpu_count()))
+# Threads keep a worker busy while it waits on SQLite locks; gevent is for the event streams
+worker_class = os.environ.get('BREAKFAST_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('BREAKFAST_THREADS', 4))
+worker_connections = int(os.environ.get('BREAKFAST_WORKER_CONNECTIONS', 1000))
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so the locks and threads it creates cooperate with greenlets
+    from gevent import monkey
+    monkey.patch_all()
+timeout = int(os.environ.get('BREAKFAST_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('BREAKFAST_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.environ.get('BREAKFAST_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Import and build the app once in the master; workers share its memory copy-on-write
+preload_app = True
+# Workers never run migrations, so skip loading Alembic. This is set here rather than in
+# wsgi.py because the flask CLI also loads wsgi.py, and `flask db` needs the full profile
+os.environ.setdefault('BREAKFAST_APP_PROFILE', 'runtime')
+
+def post_fork(server, worker):
+    # Connections inherited from the master must never be used by two processes
+    from app.database import reset_engine_after_fork
+    from wsgi import app
+    reset_engine_after_fork(app)
+
+def worker_exit(server, worker):
+    # Write out stock movements still buffered in this worker before it goes away
+    from app import stock_ledger
+    from wsgi import app
+    with app.app_context():
+        stock_ledger.flush()
@@ -0,0 +1,36 @@
+"""Add order events
+
+Revision ID: 0c9e4a7b2d61
+Revises: f3a8c5d2e7b4
+Create Date: 2026-10-18 14:22:07.581904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c9e4a7b2d61'
+down_revision = 'f3a8c5d2e7b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('order_event', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_event_order_id'), ['order_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_event_order_id'))
+
+    op.drop_table('order_event')
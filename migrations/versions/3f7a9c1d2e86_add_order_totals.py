@@ -0,0 +1,35 @@
+"""Add denormalized order totals
+
+Revision ID: 3f7a9c1d2e86
+Revises: e61f0a3b7c28
+Create Date: 2026-10-17 12:04:31.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a9c1d2e86'
+down_revision = 'e61f0a3b7c28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_amount', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill existing orders from their items
+    op.execute(
+        'UPDATE "order" SET '
+        'total_amount = (SELECT COALESCE(SUM(price * quantity), 0) FROM order_item WHERE order_item.order_id = "order".id), '
+        'item_count = (SELECT COALESCE(SUM(quantity), 0) FROM order_item WHERE order_item.order_id = "order".id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('item_count')
+        batch_op.drop_column('total_amount')
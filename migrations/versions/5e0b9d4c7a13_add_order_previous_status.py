@@ -0,0 +1,26 @@
+"""Add order previous status
+
+Revision ID: 5e0b9d4c7a13
+Revises: a83d5f6e0c21
+Create Date: 2026-10-17 15:21:09.604417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0b9d4c7a13'
+down_revision = 'a83d5f6e0c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('previous_status', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('previous_status')
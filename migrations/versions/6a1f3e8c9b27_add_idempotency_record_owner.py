@@ -0,0 +1,26 @@
+"""Add idempotency record owner
+
+Revision ID: 6a1f3e8c9b27
+Revises: 0c9e4a7b2d61
+Create Date: 2026-10-18 16:05:33.914027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1f3e8c9b27'
+down_revision = '0c9e4a7b2d61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('idempotency_record', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('owner', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_record', schema=None) as batch_op:
+        batch_op.drop_column('owner')
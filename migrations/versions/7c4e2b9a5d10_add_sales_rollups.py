@@ -0,0 +1,55 @@
+"""Add sales rollup tables
+
+Revision ID: 7c4e2b9a5d10
+Revises: 3f7a9c1d2e86
+Create Date: 2026-10-17 12:41:09.557302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2b9a5d10'
+down_revision = '3f7a9c1d2e86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('hourly_sales',
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('hour')
+    )
+    op.create_table('menu_item_daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu_item.id'], ),
+    sa.PrimaryKeyConstraint('day', 'menu_item_id')
+    )
+    op.create_table('daily_order_status',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=64), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+    # Existing orders are rolled up with `flask sales-rollups rebuild` after upgrading
+
+
+def downgrade():
+    op.drop_table('daily_order_status')
+    op.drop_table('menu_item_daily_sales')
+    op.drop_table('hourly_sales')
+    op.drop_table('daily_sales')
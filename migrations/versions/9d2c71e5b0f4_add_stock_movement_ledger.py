@@ -0,0 +1,45 @@
+"""Add stock movement ledger
+
+Revision ID: 9d2c71e5b0f4
+Revises: 4b8e2f1a9c3d
+Create Date: 2026-10-17 10:41:07.552183
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2c71e5b0f4'
+down_revision = '4b8e2f1a9c3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_movement',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=32), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu_item.id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['order.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stock_movement_menu_item_id'), ['menu_item_id'], unique=False)
+
+    # Open the ledger with each item's current stock so it reconciles from day one
+    op.execute(
+        "INSERT INTO stock_movement (menu_item_id, delta, reason, created_at) "
+        "SELECT id, stock, 'initial', CURRENT_TIMESTAMP FROM menu_item WHERE stock != 0"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stock_movement_menu_item_id'))
+
+    op.drop_table('stock_movement')
@@ -0,0 +1,31 @@
+"""Add order status counts
+
+Revision ID: b2d6f8a1c4e9
+Revises: 5e0b9d4c7a13
+Create Date: 2026-10-17 16:02:47.381925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d6f8a1c4e9'
+down_revision = '5e0b9d4c7a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_status_count',
+    sa.Column('status', sa.String(length=64), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('status')
+    )
+
+    # Backfill from the existing orders
+    op.execute('INSERT INTO order_status_count (status, order_count) SELECT status, COUNT(*) FROM "order" GROUP BY status')
+
+
+def downgrade():
+    op.drop_table('order_status_count')
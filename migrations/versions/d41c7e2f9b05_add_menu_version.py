@@ -0,0 +1,29 @@
+"""Add menu version
+
+Revision ID: d41c7e2f9b05
+Revises: b2d6f8a1c4e9
+Create Date: 2026-10-18 09:12:36.510472
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41c7e2f9b05'
+down_revision = 'b2d6f8a1c4e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('menu_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('INSERT INTO menu_version (id, version) VALUES (1, 0)')
+
+
+def downgrade():
+    op.drop_table('menu_version')
@@ -0,0 +1,26 @@
+"""Add per-item low stock threshold
+
+Revision ID: e61f0a3b7c28
+Revises: 9d2c71e5b0f4
+Create Date: 2026-10-17 11:26:53.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61f0a3b7c28'
+down_revision = '9d2c71e5b0f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('menu_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('low_stock_threshold', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('menu_item', schema=None) as batch_op:
+        batch_op.drop_column('low_stock_threshold')
@@ -0,0 +1,39 @@
+"""Add low stock alerts
+
+Revision ID: f3a8c5d2e7b4
+Revises: d41c7e2f9b05
+Create Date: 2026-10-18 10:04:51.227390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c5d2e7b4'
+down_revision = 'd41c7e2f9b05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('low_stock_alert',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('threshold', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=256), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu_item.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('low_stock_alert', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_low_stock_alert_menu_item_id'), ['menu_item_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('low_stock_alert', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_low_stock_alert_menu_item_id'))
+
+    op.drop_table('low_stock_alert')
@@ -3,4 +3,5 @@ from app import create_app
 app = create_app()
 
 if __name__ == '__main__':
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py` (see wsgi.py)
     app.run(debug=True)
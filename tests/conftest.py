@@ -1,13 +1,14 @@
+from contextlib import contextmanager
 import pytest
 from app import create_app, db
 from app.models import User, MenuItem, Order, OrderItem
 
 @pytest.fixture(scope='session')
 def app():
-    app = create_app()
-    app.config.update({
+    app = create_app({
         "TESTING": True,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", # Use in-memory SQLite for testing
+        "APP_PROFILE": "runtime", # No migrations needed
     })
     
     with app.app_context():
@@ -15,6 +16,49 @@ def app():
         yield app
         db.drop_all()
 
+@pytest.fixture()
+def make_app():
+    """Build apps with their own config and database, for tests whose state must not leak."""
+    apps = []
+
+    def factory(**config):
+        app = create_app({
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "APP_PROFILE": "runtime",
+            **config
+        })
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield factory
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+@pytest.fixture()
+def count_statements():
+    """Record the SQL an app runs: ``with count_statements(app) as statements: ...``."""
+    @contextmanager
+    def recorder(app):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        db.event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            db.event.remove(engine, 'before_cursor_execute', record)
+
+    return recorder
+
 @pytest.fixture()
 def client(app):
     return app.test_client()
@@ -149,3 +149,223 @@ def test_update_order_status_no_change_needed(client, seed_admin_api_data):
     with client.application.app_context():
         order = db.session.get(Order, order1_id)
         assert order.status == 'pending' # Should remain pending
+
+def test_get_admin_orders_query_budget(client, app, seed_admin_api_data, count_statements):
+    with app.app_context():
+        # Grow the dataset so the page is large enough to expose per-row queries
+        for _ in range(20):
+            order = Order(user_id=seed_admin_api_data['user2_id'], status='pending')
+            db.session.add(order)
+            db.session.flush()
+            for _ in range(5):
+                db.session.add(OrderItem(order_id=order.id, menu_item_id=seed_admin_api_data['item1_id'], quantity=1, price=2.50))
+        db.session.commit()
+
+        with count_statements(app) as statements:
+            small_page = client.get('/api/v1/admin/orders?per_page=2')
+            small_page_queries = len(statements)
+            del statements[:]
+            full_page = client.get('/api/v1/admin/orders?per_page=50')
+            full_page_queries = len(statements)
+
+    assert small_page.status_code == 200
+    assert full_page.status_code == 200
+    orders = full_page.get_json()['orders']
+    assert len(orders) == 23
+    assert sum(len(order['items']) for order in orders) == 103
+    assert orders[-1]['items'][0]['item_name'] == 'Coffee'
+    # COUNT + page SELECT + one eager load of items and menu names, whatever the page size
+    assert full_page_queries <= 3
+    assert full_page_queries == small_page_queries
+    # Only the listed columns are read: nothing from the user table, no password hashes
+    assert not [statement for statement in statements if 'password_hash' in statement or 'FROM user' in statement]
+
+def test_get_admin_orders_cursor_pagination(client, seed_admin_api_data):
+    response = client.get('/api/v1/admin/orders?pagination=cursor&per_page=2')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 'total_items' not in data # COUNT(*) is skipped unless requested
+    assert [order['id'] for order in data['orders']] == [seed_admin_api_data['order3_id'], seed_admin_api_data['order2_id']]
+    assert data['next_cursor']
+
+    response = client.get(f"/api/v1/admin/orders?cursor={data['next_cursor']}&per_page=2")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [order['id'] for order in data['orders']] == [seed_admin_api_data['order1_id']]
+    assert len(data['orders'][0]['items']) == 2
+    assert data['next_cursor'] is None
+
+def test_get_admin_orders_cursor_with_filters_and_total(client, seed_admin_api_data):
+    user1_id = seed_admin_api_data['user1_id']
+    response = client.get(f'/api/v1/admin/orders?pagination=cursor&per_page=1&user_id={user1_id}&include_total=true')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total_items'] == 2
+    assert data['orders'][0]['id'] == seed_admin_api_data['order2_id']
+
+    response = client.get(f"/api/v1/admin/orders?cursor={data['next_cursor']}&per_page=1&user_id={user1_id}")
+    data = response.get_json()
+    assert data['orders'][0]['id'] == seed_admin_api_data['order1_id']
+    assert data['next_cursor'] is None
+
+def test_get_admin_orders_cursor_same_timestamp(client, app, seed_admin_api_data):
+    with app.app_context():
+        created_at = datetime.utcnow() - timedelta(days=5)
+        tied_orders = [Order(user_id=seed_admin_api_data['user2_id'], created_at=created_at) for _ in range(3)]
+        db.session.add_all(tied_orders)
+        db.session.commit()
+        tied_ids = sorted((order.id for order in tied_orders), reverse=True)
+
+    seen = []
+    cursor = ''
+    while True:
+        data = client.get(f'/api/v1/admin/orders?cursor={cursor}&per_page=2').get_json()
+        seen.extend(order['id'] for order in data['orders'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 6
+    assert seen[-3:] == tied_ids
+
+def keyset_query_plans(app, request):
+    # Run ``request()`` and EXPLAIN every page query after a cursor, with the parameters it was bound to
+    with app.app_context():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('SELECT "order".id') and 'WHERE' in statement: # No filters, so only the cursor
+                captured.append((statement, parameters))
+
+        db.event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            request()
+        finally:
+            db.event.remove(db.engine, 'before_cursor_execute', capture)
+        connection = db.session.connection()
+        plans = [
+            [row[3] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+            for statement, parameters in captured
+        ]
+        db.session.rollback()
+        return plans
+
+def test_get_admin_orders_cursor_seeks_the_index(client, app, seed_admin_api_data):
+    # A deep page must be an index range search, not a scan from the newest order
+    first = client.get('/api/v1/admin/orders?pagination=cursor&per_page=1').get_json()
+    plans = keyset_query_plans(app, lambda: client.get(f"/api/v1/admin/orders?cursor={first['next_cursor']}&per_page=1"))
+    assert len(plans) == 1
+    assert plans[0] == ['SEARCH order USING INDEX ix_order_created_at (created_at<?)']
+
+def test_get_admin_orders_invalid_cursor(client, seed_admin_api_data):
+    response = client.get('/api/v1/admin/orders?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert 'Invalid cursor' in response.get_json()['message']
+
+def test_cancel_order_restores_stock(client, seed_admin_api_data):
+    order1_id = seed_admin_api_data['order1_id'] # pending: 2 Coffee, 1 Sandwich
+    response = client.put(f'/api/v1/orders/{order1_id}/status', json={'status': 'cancelled'})
+    assert response.status_code == 200
+    assert 'status updated to cancelled' in response.get_json()['message']
+
+    with client.application.app_context():
+        assert db.session.get(Order, order1_id).status == 'cancelled'
+        assert db.session.get(MenuItem, seed_admin_api_data['item1_id']).stock == 12
+        assert db.session.get(MenuItem, seed_admin_api_data['item2_id']).stock == 6
+
+    # Cancelling again is a no-op and restores nothing
+    response = client.put(f'/api/v1/orders/{order1_id}/status', json={'status': 'cancelled'})
+    assert 'No change needed' in response.get_json()['message']
+    with client.application.app_context():
+        assert db.session.get(MenuItem, seed_admin_api_data['item1_id']).stock == 12
+
+def test_update_order_status_ready_for_delivery(client, seed_admin_api_data):
+    order2_id = seed_admin_api_data['order2_id'] # status is 'processing'
+    response = client.put(f'/api/v1/orders/{order2_id}/status', json={'status': 'ready_for_delivery'})
+    assert response.status_code == 200
+    assert 'status updated to ready_for_delivery' in response.get_json()['message']
+
+    response = client.put(f'/api/v1/orders/{order2_id}/status', json={'status': 'processing'})
+    assert response.status_code == 400
+    assert 'Invalid status transition from ready_for_delivery to processing' in response.get_json()['message']
+
+    response = client.put(f'/api/v1/orders/{order2_id}/status', json={'status': 'completed'})
+    assert response.status_code == 200
+    with client.application.app_context():
+        order = db.session.get(Order, order2_id)
+        assert (order.status, order.previous_status) == ('completed', 'ready_for_delivery')
+
+def test_update_order_status_unknown_status(client, seed_admin_api_data):
+    order1_id = seed_admin_api_data['order1_id']
+    response = client.put(f'/api/v1/orders/{order1_id}/status', json={'status': 'shipped'})
+    assert response.status_code == 400
+    assert 'Invalid status transition from pending to shipped' in response.get_json()['message']
+
+def test_get_admin_orders_includes_totals(client, seed_admin_api_data):
+    response = client.post('/api/v1/orders', json={
+        'user_id': seed_admin_api_data['user2_id'],
+        'items': [
+            {'item_id': seed_admin_api_data['item1_id'], 'quantity': 2},
+            {'item_id': seed_admin_api_data['item2_id'], 'quantity': 1}
+        ]
+    })
+    order_id = response.get_json()['order_id']
+
+    response = client.get(f"/api/v1/admin/orders?user_id={seed_admin_api_data['user2_id']}")
+    order = next(order for order in response.get_json()['orders'] if order['id'] == order_id)
+    assert order['total_amount'] == 2 * 2.50 + 5.00
+    assert order['item_count'] == 3
+
+def test_get_admin_orders_matches_orm_serialization(client, app, seed_admin_api_data):
+    from app.api.admin import serialize_orders
+    response = client.get('/api/v1/admin/orders')
+    with app.app_context():
+        # The column-projected rows serialize exactly like full Order objects
+        orders = Order.query.order_by(Order.created_at.desc()).all()
+        assert response.get_json()['orders'] == serialize_orders(orders)
+
+# --- Order Export Tests ---
+
+def test_export_orders_csv(client, app, seed_admin_api_data, count_statements, monkeypatch):
+    import csv
+    import io
+    monkeypatch.setitem(app.config, 'ORDER_EXPORT_CHUNK_SIZE', 2) # Several chunks for three orders
+    with count_statements(app) as statements:
+        response = client.get('/api/v1/admin/orders/export?format=csv')
+        body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(body)))
+    # Newest first, one line per item; the completed order has no items
+    assert [row['order_id'] for row in rows] == [str(seed_admin_api_data[key]) for key in ('order3_id', 'order2_id', 'order1_id', 'order1_id')]
+    assert rows[0]['item_id'] == ''
+    assert {row['item_name'] for row in rows[2:]} == {'Coffee', 'Sandwich'}
+    # Two chunks: an orders query and an items query each, no COUNT
+    assert len(statements) == 4
+    assert not [statement for statement in statements if 'count(' in statement.lower()]
+
+def test_export_chunks_seek_the_index(client, app, seed_admin_api_data, monkeypatch):
+    # Every chunk after the first starts where the last one ended, instead of rescanning from the newest order
+    monkeypatch.setitem(app.config, 'ORDER_EXPORT_CHUNK_SIZE', 1)
+    plans = keyset_query_plans(app, lambda: client.get('/api/v1/admin/orders/export?format=ndjson').get_data())
+    assert len(plans) == 3 # Chunks two and three, plus the empty read that ends the export
+    assert all(plan == ['SEARCH order USING INDEX ix_order_created_at (created_at<?)'] for plan in plans)
+
+def test_export_orders_ndjson_with_filters(client, seed_admin_api_data):
+    import json
+    user1_id = seed_admin_api_data['user1_id']
+    response = client.get(f'/api/v1/admin/orders/export?format=ndjson&user_id={user1_id}')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    orders = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [order['id'] for order in orders] == [seed_admin_api_data['order2_id'], seed_admin_api_data['order1_id']]
+    # Same shape as the admin list
+    listed = client.get(f'/api/v1/admin/orders?user_id={user1_id}').get_json()['orders']
+    assert orders == listed
+
+def test_export_orders_rejects_bad_arguments(client, seed_admin_api_data):
+    assert client.get('/api/v1/admin/orders/export?format=xml').status_code == 400
+    response = client.get('/api/v1/admin/orders/export?start_date=2024/01/01')
+    assert response.status_code == 400
+    assert 'YYYY-MM-DD' in response.get_json()['message']
@@ -0,0 +1,141 @@
+import threading
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import User, MenuItem, Order, OrderItem
+from app.services import OrderService
+
+THREADS = 8
+ORDERS_PER_THREAD = 15
+INITIAL_STOCK = 50
+
+@pytest.fixture
+def file_app(make_app, tmp_path):
+    # Concurrency needs real connections to a shared file, not the in-memory test DB
+    return make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'stress.db'}")
+
+@pytest.fixture
+def seed_stress_data(file_app):
+    with file_app.app_context():
+        user = User(username='stress_user', email='stress@example.com', password_hash='x')
+        item = MenuItem(name='Egg Pancake', price=35.0, stock=INITIAL_STOCK)
+        db.session.add_all([user, item])
+        db.session.commit()
+        return user.id, item.id
+
+def test_concurrent_orders_never_oversell(file_app, seed_stress_data):
+    user_id, item_id = seed_stress_data
+    outcomes = {'created': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def place_orders():
+        with file_app.app_context():
+            start.wait()
+            for _ in range(ORDERS_PER_THREAD):
+                try:
+                    OrderService.create_order(user_id, [{'item_id': item_id, 'quantity': 1}])
+                    outcome = 'created'
+                except ValueError:
+                    outcome = 'rejected'
+                except OperationalError:
+                    db.session.rollback()
+                    outcome = 'errors'
+                with lock:
+                    outcomes[outcome] += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=place_orders) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with file_app.app_context():
+        stock = db.session.get(MenuItem, item_id).stock
+        sold = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).scalar()
+        order_count = Order.query.count()
+
+    assert stock >= 0
+    assert sold == INITIAL_STOCK - stock
+    assert order_count == outcomes['created']
+    # Demand exceeds supply, so the item should sell out exactly
+    assert outcomes['errors'] == 0
+    assert stock == 0
+    assert outcomes['created'] == INITIAL_STOCK
+    assert outcomes['rejected'] == THREADS * ORDERS_PER_THREAD - INITIAL_STOCK
+
+def test_concurrent_cancellations_restore_stock_once(file_app, seed_stress_data):
+    user_id, item_id = seed_stress_data
+    with file_app.app_context():
+        order, _ = OrderService.create_order(user_id, [{'item_id': item_id, 'quantity': 5}])
+        order_id = order.id
+    outcomes = []
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def cancel():
+        with file_app.app_context():
+            start.wait()
+            try:
+                outcome = OrderService.cancel_order(order_id, 'pending')
+            except OperationalError:
+                db.session.rollback()
+                outcome = 'error'
+            with lock:
+                outcomes.append(outcome)
+            db.session.remove()
+
+    threads = [threading.Thread(target=cancel) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with file_app.app_context():
+        assert db.session.get(MenuItem, item_id).stock == INITIAL_STOCK
+        assert db.session.get(Order, order_id).status == 'cancelled'
+    assert outcomes.count(True) == 1
+    assert outcomes.count(False) == THREADS - 1
+
+def test_concurrent_conflicting_transitions_apply_once(file_app, seed_stress_data):
+    user_id, item_id = seed_stress_data
+    with file_app.app_context():
+        order, _ = OrderService.create_order(user_id, [{'item_id': item_id, 'quantity': 5}])
+        order_id = order.id
+    outcomes = []
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def change(new_status):
+        with file_app.app_context():
+            start.wait()
+            try:
+                outcome = OrderService.change_status(order_id, new_status) is not None
+            except OperationalError:
+                db.session.rollback()
+                outcome = 'error'
+            with lock:
+                outcomes.append((new_status, outcome))
+            db.session.remove()
+
+    # Half the admins start processing the pending order while the other half cancel it
+    statuses = ['processing', 'cancelled'] * (THREADS // 2)
+    threads = [threading.Thread(target=change, args=(new_status,)) for new_status in statuses]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = {new_status for new_status, outcome in outcomes if outcome is True}
+    assert sum(1 for _, outcome in outcomes if outcome is True) == len(winners) # Each change applied at most once
+    with file_app.app_context():
+        order = db.session.get(Order, order_id)
+        stock = db.session.get(MenuItem, item_id).stock
+    if winners == {'processing', 'cancelled'}:
+        # Processing first, then cancelled from processing: both are legal, in that order only
+        assert (order.status, order.previous_status) == ('cancelled', 'processing')
+    else:
+        assert winners == {order.status}
+        assert order.previous_status == 'pending'
+    assert stock == (INITIAL_STOCK if order.status == 'cancelled' else INITIAL_STOCK - 5)
@@ -1,4 +1,6 @@
 import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
 from app import db
 from app.models import User, MenuItem, Order, OrderItem
 from datetime import datetime, timedelta
@@ -149,6 +151,42 @@ def test_create_order_missing_items_data(client, seed_customer_api_data):
     data = response.get_json()
     assert 'Items data (list of item_id and quantity) is required' in data['message']
 
+def test_create_order_malformed_request_runs_no_queries(client, app, seed_customer_api_data, count_statements):
+    user_id = seed_customer_api_data['user1_id']
+    item1_id = seed_customer_api_data['item1_id']
+    payloads = [
+        {'user_id': 'abc', 'items': [{'item_id': item1_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': item1_id, 'quantity': -1}]},
+        {'user_id': user_id, 'items': [{'item_id': 'x', 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': item1_id, 'quantity': 1}] * 51},
+    ]
+
+    with count_statements(app) as statements:
+        responses = [client.post('/api/v1/orders', json=payload) for payload in payloads]
+
+    assert [response.status_code for response in responses] == [400] * len(payloads)
+    assert statements == []
+
+def test_create_order_coalesces_duplicate_items(client, seed_customer_api_data):
+    user_id = seed_customer_api_data['user1_id']
+    item1_id = seed_customer_api_data['item1_id'] # stock 5
+
+    request_payload = {
+        'user_id': user_id,
+        'items': [
+            {'item_id': item1_id, 'quantity': 2},
+            {'item_id': item1_id, 'quantity': 2}
+        ]
+    }
+    response = client.post('/api/v1/orders', json=request_payload)
+    assert response.status_code == 201
+    assert response.get_json()['total_amount'] == 4 * 8.00
+
+    with client.application.app_context():
+        order_items = OrderItem.query.filter_by(order_id=response.get_json()['order_id']).all()
+        assert [(item.menu_item_id, item.quantity) for item in order_items] == [(item1_id, 4)]
+        assert db.session.get(MenuItem, item1_id).stock == 1
+
 # --- Menu API Tests (Task 17) ---
 
 def test_get_menu_success(client, seed_customer_api_data):
@@ -174,4 +212,210 @@ def test_get_menu_success(client, seed_customer_api_data):
     # Check an out-of-stock item
     drink_item = next((item for item in data['menu'] if item['name'] == 'Drink'), None)
     assert drink_item is not None
-    assert drink_item['stock'] == 0
\ No newline at end of file
+    assert drink_item['stock'] == 0
+
+def test_get_menu_etag_not_modified(client, app, seed_customer_api_data, count_statements):
+    response = client.get('/api/v1/menu')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag
+
+    with count_statements(app) as statements:
+        cached = client.get('/api/v1/menu')
+        not_modified = client.get('/api/v1/menu', headers={'If-None-Match': etag})
+
+    assert statements == [] # Served from the cache without touching the database
+    assert cached.status_code == 200
+    assert cached.headers['ETag'] == etag
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+def test_get_menu_cache_invalidated_by_order(client, seed_customer_api_data):
+    etag = client.get('/api/v1/menu').headers['ETag']
+
+    request_payload = {
+        'user_id': seed_customer_api_data['user1_id'],
+        'items': [{'item_id': seed_customer_api_data['item1_id'], 'quantity': 2}]
+    }
+    assert client.post('/api/v1/orders', json=request_payload).status_code == 201
+
+    response = client.get('/api/v1/menu', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    burger = next(item for item in response.get_json()['menu'] if item['name'] == 'Burger')
+    assert burger['stock'] == 3
+
+def test_get_menu_cache_invalidated_by_menu_edit(client, app, seed_customer_api_data):
+    etag = client.get('/api/v1/menu').headers['ETag']
+
+    with app.app_context():
+        fries = db.session.get(MenuItem, seed_customer_api_data['item2_id'])
+        fries.price = 3.50
+        db.session.commit()
+
+    response = client.get('/api/v1/menu', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    fries = next(item for item in response.get_json()['menu'] if item['name'] == 'Fries')
+    assert fries['price'] == 3.50
+
+def test_get_menu_sees_stock_changes_from_other_workers(make_app, tmp_path):
+    # Two apps on one database file stand in for two gunicorn worker processes
+    database_uri = f"sqlite:///{tmp_path / 'menu.db'}"
+    worker_a = make_app(SQLALCHEMY_DATABASE_URI=database_uri)
+    worker_b = make_app(SQLALCHEMY_DATABASE_URI=database_uri, MENU_CACHE_CHECK_SECONDS=0)
+    with worker_a.app_context():
+        user = User(username='worker_user', email='worker@example.com', password_hash='x')
+        toast = MenuItem(name='Toast', price=3.00, stock=5)
+        db.session.add_all([user, toast])
+        db.session.commit()
+        user_id, toast_id = user.id, toast.id
+
+    client_b = worker_b.test_client()
+    etag = client_b.get('/api/v1/menu').headers['ETag']
+    response = worker_a.test_client().post('/api/v1/orders', json={
+        'user_id': user_id, 'items': [{'item_id': toast_id, 'quantity': 2}]
+    })
+    assert response.status_code == 201
+
+    response = client_b.get('/api/v1/menu', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['menu'][0]['stock'] == 3
+
+def test_get_menu_cache_expires_after_ttl(make_app):
+    app = make_app(MENU_CACHE_TTL_SECONDS=0, MENU_CACHE_CHECK_SECONDS=60)
+    with app.app_context():
+        db.session.add(MenuItem(name='Toast', price=3.00, stock=5))
+        db.session.commit()
+        client = app.test_client()
+        assert client.get('/api/v1/menu').get_json()['menu'][0]['stock'] == 5
+
+        # A write that bypasses the session, and so never bumps the menu version
+        db.session.remove()
+        with db.engine.begin() as connection:
+            connection.execute(db.update(MenuItem).values(stock=1))
+        assert client.get('/api/v1/menu').get_json()['menu'][0]['stock'] == 1
+
+# --- Bulk Order API Tests ---
+
+def test_create_orders_batch_success(client, seed_customer_api_data):
+    user_id = seed_customer_api_data['user1_id']
+    burger_id = seed_customer_api_data['item1_id']
+    fries_id = seed_customer_api_data['item2_id']
+
+    request_payload = {'orders': [
+        {'user_id': user_id, 'items': [{'item_id': burger_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': burger_id, 'quantity': 2}, {'item_id': fries_id, 'quantity': 3}]},
+    ]}
+    response = client.post('/api/v1/orders/batch', json=request_payload)
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['created'] == 2
+    assert [result['total_amount'] for result in data['results']] == [8.00, 2 * 8.00 + 3 * 3.00]
+
+    with client.application.app_context():
+        assert Order.query.count() == 2
+        totals = [(order.total_amount, order.item_count) for order in Order.query.order_by(Order.id)]
+        assert totals == [(8.00, 1), (2 * 8.00 + 3 * 3.00, 5)]
+        assert db.session.get(MenuItem, burger_id).stock == 2
+        assert db.session.get(MenuItem, fries_id).stock == 7
+
+def test_create_orders_batch_partial_failure(client, seed_customer_api_data):
+    user_id = seed_customer_api_data['user1_id']
+    burger_id = seed_customer_api_data['item1_id'] # stock 5
+
+    request_payload = {'orders': [
+        {'user_id': user_id, 'items': [{'item_id': burger_id, 'quantity': 4}]},
+        {'user_id': user_id, 'items': [{'item_id': burger_id, 'quantity': 2}]}, # Only 1 left after the first order
+        {'user_id': 999, 'items': [{'item_id': burger_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': 999, 'quantity': 1}]},
+        {'items': [{'item_id': burger_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': burger_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': burger_id, 'quantity': 0}]},
+    ]}
+    response = client.post('/api/v1/orders/batch', json=request_payload)
+    assert response.status_code == 207
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, False, False, False, False, True, False]
+    assert 'Not enough stock for Burger. Available: 1, Requested: 2' in results[1]['message']
+    assert 'User with ID 999 not found' in results[2]['message']
+    assert 'MenuItem with ID 999 not found' in results[3]['message']
+    assert 'User ID is required' in results[4]['message']
+    assert 'Invalid quantity for item' in results[6]['message']
+
+    with client.application.app_context():
+        assert Order.query.count() == 2
+        assert db.session.get(MenuItem, burger_id).stock == 0
+
+def test_create_orders_batch_chunked_query_count(client, app, seed_customer_api_data, count_statements):
+    user_id = seed_customer_api_data['user1_id']
+    fries_id = seed_customer_api_data['item2_id']
+    request_payload = {
+        'orders': [{'user_id': user_id, 'items': [{'item_id': fries_id, 'quantity': 1}]} for _ in range(10)],
+        'chunk_size': 5
+    }
+
+    with count_statements(app) as statements:
+        response = client.post('/api/v1/orders/batch', json=request_payload)
+
+    with app.app_context():
+        assert response.status_code == 201
+        assert db.session.get(MenuItem, fries_id).stock == 0
+    # Lookups, stock reservation and line-item inserts run once per chunk, not once per order
+    count = lambda prefix: sum(1 for statement in statements if statement.startswith(prefix))
+    assert count('SELECT user.id') == 2
+    assert count('SELECT menu_item.id') == 2
+    assert count('UPDATE menu_item') == 2
+    assert count('INSERT INTO order_item') == 2
+
+def test_create_orders_batch_failed_chunk_keeps_committed_results(client, app, seed_customer_api_data):
+    user_id = seed_customer_api_data['user1_id']
+    fries_id = seed_customer_api_data['item2_id']
+    request_payload = {
+        'orders': [{'user_id': user_id, 'items': [{'item_id': fries_id, 'quantity': 1}]} for _ in range(3)],
+        'chunk_size': 1
+    }
+    commits = []
+
+    def lock_second_chunk(session):
+        commits.append(session)
+        if len(commits) == 2:
+            raise OperationalError('COMMIT', {}, Exception('database is locked'))
+
+    db.event.listen(Session, 'before_commit', lock_second_chunk)
+    try:
+        response = client.post('/api/v1/orders/batch', json=request_payload)
+    finally:
+        db.event.remove(Session, 'before_commit', lock_second_chunk)
+
+    # The first chunk was committed before the second failed: report both, never a bare 500
+    assert response.status_code == 207
+    data = response.get_json()
+    assert (data['created'], data['failed']) == (2, 1)
+    assert [result['success'] for result in data['results']] == [True, False, True]
+    assert 'database is locked' in data['results'][1]['message']
+    with app.app_context():
+        assert sorted(db.session.execute(db.select(Order.id)).scalars()) == sorted(
+            result['order_id'] for result in data['results'] if result['success'])
+        assert db.session.get(MenuItem, fries_id).stock == 10 - 2
+
+def test_create_orders_batch_requires_orders(client, seed_customer_api_data):
+    response = client.post('/api/v1/orders/batch', json={'orders': []})
+    assert response.status_code == 400
+    assert 'Orders data (list of orders) is required' in response.get_json()['message']
+
+def test_get_menu_payload_matches_model_fields(client, app, seed_customer_api_data):
+    response = client.get('/api/v1/menu')
+    with app.app_context():
+        expected = [
+            {
+                'id': item.id,
+                'name': item.name,
+                'description': item.description,
+                'price': item.price,
+                'stock': item.stock,
+                'image_url': item.image_url
+            }
+            for item in MenuItem.query.all()
+        ]
+    assert response.get_json()['menu'] == expected
+    assert list(response.get_json()['menu'][0]) == ['id', 'name', 'description', 'price', 'stock', 'image_url']
@@ -0,0 +1,192 @@
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import User, MenuItem, Order, IdempotencyRecord
+from app.idempotency import _claim, _complete
+from app.services import OrderService
+
+def seed_idempotency_data(app):
+    with app.app_context():
+        user = User(username='retry_user', email='retry@example.com', password_hash='x')
+        item = MenuItem(name='Toast', price=4.00, stock=10)
+        db.session.add_all([user, item])
+        db.session.commit()
+        return user.id, item.id
+
+@pytest.fixture
+def idempotency_app(make_app):
+    # A fresh app per test, so cached keys do not leak between tests
+    app = make_app()
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def idempotency_data(idempotency_app):
+    return seed_idempotency_data(idempotency_app)
+
+def order_payload(seed, quantity=1):
+    user_id, item_id = seed
+    return {'user_id': user_id, 'items': [{'item_id': item_id, 'quantity': quantity}]}
+
+def test_retry_replays_original_response(idempotency_app, idempotency_data, monkeypatch):
+    client = idempotency_app.test_client()
+    headers = {'Idempotency-Key': 'order-1'}
+    first = client.post('/api/v1/orders', json=order_payload(idempotency_data, 2), headers=headers)
+    assert first.status_code == 201
+    assert 'Idempotent-Replayed' not in first.headers
+
+    def fail(*args, **kwargs):
+        raise AssertionError('A replay must not create the order again')
+    monkeypatch.setattr(OrderService, 'create_order', staticmethod(fail))
+
+    retry = client.post('/api/v1/orders', json=order_payload(idempotency_data, 2), headers=headers)
+    assert retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert Order.query.count() == 1
+    assert db.session.get(MenuItem, idempotency_data[1]).stock == 8
+
+    # Still replayed from the table once the in-memory entry is gone (e.g. another worker)
+    idempotency_app.extensions['idempotency'].cache.clear()
+    retry = client.post('/api/v1/orders', json=order_payload(idempotency_data, 2), headers=headers)
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+def test_key_reused_for_another_request(idempotency_app, idempotency_data):
+    client = idempotency_app.test_client()
+    headers = {'Idempotency-Key': 'order-2'}
+    client.post('/api/v1/orders', json=order_payload(idempotency_data, 1), headers=headers)
+    response = client.post('/api/v1/orders', json=order_payload(idempotency_data, 3), headers=headers)
+    assert response.status_code == 422
+    assert Order.query.count() == 1
+
+def test_client_errors_are_replayed_but_server_errors_are_not(idempotency_app, idempotency_data, monkeypatch):
+    client = idempotency_app.test_client()
+    response = client.post('/api/v1/orders', json=order_payload(idempotency_data, 50), headers={'Idempotency-Key': 'too-many'})
+    assert response.status_code == 400
+    retry = client.post('/api/v1/orders', json=order_payload(idempotency_data, 50), headers={'Idempotency-Key': 'too-many'})
+    assert retry.status_code == 400
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+    real_create_order = OrderService.create_order
+    def broken(*args, **kwargs):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(OrderService, 'create_order', staticmethod(broken))
+    response = client.post('/api/v1/orders', json=order_payload(idempotency_data), headers={'Idempotency-Key': 'flaky'})
+    assert response.status_code == 500
+    assert db.session.get(IdempotencyRecord, 'flaky') is None
+
+    monkeypatch.setattr(OrderService, 'create_order', staticmethod(real_create_order))
+    response = client.post('/api/v1/orders', json=order_payload(idempotency_data), headers={'Idempotency-Key': 'flaky'})
+    assert response.status_code == 201
+
+def test_keys_expire_after_ttl(make_app):
+    app = make_app(IDEMPOTENCY_TTL_SECONDS=0)
+    seed = seed_idempotency_data(app)
+    client = app.test_client()
+    headers = {'Idempotency-Key': 'short-lived'}
+    first = client.post('/api/v1/orders', json=order_payload(seed), headers=headers)
+    second = client.post('/api/v1/orders', json=order_payload(seed), headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert first.get_json()['order_id'] != second.get_json()['order_id']
+    assert 'Idempotent-Replayed' not in second.headers
+
+    time.sleep(0.01)
+    with app.app_context(): # CLI commands otherwise run in whichever app context is already active
+        result = app.test_cli_runner().invoke(args=['idempotency-keys', 'purge'])
+    assert 'Deleted 1 expired record(s).' in result.output
+
+def test_invalid_key(idempotency_app, idempotency_data):
+    client = idempotency_app.test_client()
+    response = client.post('/api/v1/orders', json=order_payload(idempotency_data), headers={'Idempotency-Key': 'k' * 256})
+    assert response.status_code == 400
+    assert Order.query.count() == 0
+
+def test_malformed_request_with_key_runs_no_queries(idempotency_app, idempotency_data, count_statements):
+    client = idempotency_app.test_client()
+    payload = order_payload(idempotency_data, 0)
+    with count_statements(idempotency_app) as statements:
+        responses = [client.post('/api/v1/orders', json=payload, headers={'Idempotency-Key': 'bad'}) for _ in range(2)]
+    assert [response.status_code for response in responses] == [400, 400]
+    assert statements == []
+    assert db.session.get(IdempotencyRecord, 'bad') is None
+
+def test_concurrent_requests_with_same_key_run_once(make_app, tmp_path, monkeypatch):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'idempotency.db'}")
+    seed = seed_idempotency_data(app)
+    real_create_order = OrderService.create_order
+    calls = []
+
+    def slow_create_order(user_id, items_data):
+        calls.append(user_id)
+        time.sleep(0.2) # Long enough for every retry to arrive while the first one runs
+        return real_create_order(user_id, items_data)
+    monkeypatch.setattr(OrderService, 'create_order', staticmethod(slow_create_order))
+
+    responses = []
+    lock = threading.Lock()
+    start = threading.Barrier(4)
+
+    def post():
+        client = app.test_client()
+        start.wait()
+        response = client.post('/api/v1/orders', json=order_payload(seed), headers={'Idempotency-Key': 'burst'})
+        with lock:
+            responses.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=post) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert {status for status, _ in responses} == {201}
+    assert len({body['order_id'] for _, body in responses}) == 1
+    with app.app_context():
+        assert Order.query.count() == 1
+
+def test_expired_record_is_taken_over_once(idempotency_app):
+    key = 'stale'
+    db.session.add(IdempotencyRecord(key=key, request_hash='x', owner='old', expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    state = idempotency_app.extensions['idempotency']
+
+    claim, stored = _claim(state, key, 'first')
+    assert stored is None and claim.owner != 'old'
+    # A second request that also saw the record expired must not win it too
+    db.session.execute(db.update(IdempotencyRecord).where(IdempotencyRecord.key == key)
+                       .values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    other, _ = _claim(state, key, 'second')
+    assert other is not None
+    assert _complete(claim, 'first', {}, 201) is None # The first claim is no longer ours
+    assert db.session.get(IdempotencyRecord, key).owner == other.owner
+
+def test_taken_over_request_does_not_create_its_order(make_app, tmp_path, monkeypatch):
+    # Two apps on one database file stand in for two worker processes; claims expire at once
+    database_uri = f"sqlite:///{tmp_path / 'idempotency.db'}"
+    worker_a = make_app(SQLALCHEMY_DATABASE_URI=database_uri, IDEMPOTENCY_LOCK_SECONDS=0)
+    worker_b = make_app(SQLALCHEMY_DATABASE_URI=database_uri, IDEMPOTENCY_LOCK_SECONDS=0)
+    seed = seed_idempotency_data(worker_a)
+    headers = {'Idempotency-Key': 'slow'}
+    real_create_order = OrderService.create_order
+    calls = []
+    retries = []
+
+    def slow_create_order(user_id, items_data):
+        calls.append(user_id)
+        if len(calls) == 1:
+            # The client gives up on worker a and retries on worker b while a is still running
+            retries.append(worker_b.test_client().post('/api/v1/orders', json=order_payload(seed), headers=headers))
+        return real_create_order(user_id, items_data)
+    monkeypatch.setattr(OrderService, 'create_order', staticmethod(slow_create_order))
+
+    first = worker_a.test_client().post('/api/v1/orders', json=order_payload(seed), headers=headers)
+    assert retries[0].status_code == 201
+    assert first.status_code == 409
+    with worker_a.app_context():
+        assert Order.query.count() == 1
+        assert db.session.get(IdempotencyRecord, 'slow').status_code == 201
@@ -0,0 +1,42 @@
+import logging
+import pytest
+from app import db
+from app.models import MenuItem
+
+@pytest.fixture
+def metrics_app(make_app):
+    app = make_app(SLOW_REQUEST_THRESHOLD_MS=0) # Log every request
+    with app.app_context():
+        db.session.add(MenuItem(name='Toast', price=1.50, stock=10))
+        db.session.commit()
+    return app
+
+def test_metrics_endpoint_reports_latency_and_sql(metrics_app):
+    client = metrics_app.test_client()
+    assert client.get('/api/v1/menu').status_code == 200
+    assert client.get('/api/v1/menu').status_code == 200 # Served from the menu cache
+    assert client.put('/api/v1/orders/999/status', json={'status': 'processing'}).status_code == 404
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+
+    assert 'http_requests_total{method="GET",route="/api/v1/menu",status="200"} 2' in body
+    assert 'http_requests_total{method="PUT",route="/api/v1/orders/<int:order_id>/status",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/menu"} 2' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/menu",le="+Inf"} 2' in body
+    # First menu request read the menu version and the menu, the cached one ran nothing
+    assert 'http_request_sql_statements_sum{method="GET",route="/api/v1/menu"} 2' in body
+    assert 'http_request_sql_statements_bucket{method="GET",route="/api/v1/menu",le="0"} 1' in body
+    assert 'http_request_sql_duration_seconds_total{method="GET",route="/api/v1/menu"}' in body
+
+def test_slow_request_log(metrics_app, caplog):
+    client = metrics_app.test_client()
+    with caplog.at_level(logging.WARNING, logger='app.metrics'):
+        client.get('/api/v1/menu')
+    assert any('Slow request: GET /api/v1/menu' in record.getMessage() for record in caplog.records)
+
+def test_metrics_can_be_disabled(make_app):
+    app = make_app(METRICS_ENABLED=False)
+    assert app.test_client().get('/metrics').status_code == 404
@@ -0,0 +1,187 @@
+import json
+import threading
+import pytest
+from app import db, order_events
+from app.models import User, Order, OrderEvent
+
+SSE_CONFIG = {
+    "SSE_HEARTBEAT_SECONDS": 0.05,
+    "SSE_POLL_SECONDS": 0.05,
+    "SSE_MAX_STREAM_SECONDS": 0.3,
+    "SSE_REPLAY_BUFFER_SIZE": 3,
+}
+
+def seed_event_orders(app):
+    with app.app_context():
+        user = User(username='sse_user', email='sse@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        orders = [Order(user_id=user.id, status='pending') for _ in range(2)]
+        db.session.add_all(orders)
+        db.session.commit()
+        return [order.id for order in orders]
+
+@pytest.fixture
+def events_app(make_app):
+    # A fresh app per test, so no events leak between tests
+    app = make_app(**SSE_CONFIG)
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def event_order_ids(events_app):
+    return seed_event_orders(events_app)
+
+def publish(app, order_id, status):
+    with app.app_context():
+        order_events.publish(db.session, order_id, {'order_id': order_id, 'status': status})
+        db.session.commit()
+
+def parse_frames(body):
+    frames = []
+    for block in body.split('\n\n'):
+        fields = {}
+        for line in block.splitlines():
+            name, _, value = line.partition(': ')
+            fields[name] = value
+        if fields:
+            frames.append(fields)
+    return frames
+
+def read_stream(client, path, **kwargs):
+    response = client.get(path, **kwargs)
+    assert response.status_code == 200
+    return response, parse_frames(response.get_data(as_text=True))
+
+def test_status_change_is_published_after_commit(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, second_id = event_order_ids
+    client.put(f'/api/v1/orders/{first_id}/status', json={'status': 'processing'})
+    client.put(f'/api/v1/orders/{second_id}/status', json={'status': 'processing'})
+
+    response, frames = read_stream(client, f'/api/v1/orders/{first_id}/events', headers={'Last-Event-ID': '0'})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert frames[0] == {'retry': '3000'}
+    status_frames = [frame for frame in frames if frame.get('event') == 'status']
+    assert len(status_frames) == 1 # Only the requested order
+    assert status_frames[0]['id'] == '1'
+    payload = json.loads(status_frames[0]['data'])
+    assert payload['order_id'] == first_id
+    assert payload['status'] == 'processing'
+    assert payload['previous_status'] == 'pending'
+
+def test_admin_feed_receives_every_order(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, second_id = event_order_ids
+    client.put(f'/api/v1/orders/{first_id}/status', json={'status': 'processing'})
+    client.put(f'/api/v1/orders/{second_id}/status', json={'status': 'cancelled'})
+
+    _, frames = read_stream(client, '/api/v1/admin/orders/events', headers={'Last-Event-ID': '0'})
+    payloads = [json.loads(frame['data']) for frame in frames if frame.get('event') == 'status']
+    assert [(p['order_id'], p['status']) for p in payloads] == [(first_id, 'processing'), (second_id, 'cancelled')]
+
+def test_rejected_transition_publishes_nothing(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, _ = event_order_ids
+    response = client.put(f'/api/v1/orders/{first_id}/status', json={'status': 'completed'})
+    assert response.status_code == 400
+
+    _, frames = read_stream(client, '/api/v1/admin/orders/events', headers={'Last-Event-ID': '0'})
+    assert not [frame for frame in frames if frame.get('event') == 'status']
+
+def test_live_subscriber_is_woken_by_publish(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, _ = event_order_ids
+
+    timer = threading.Timer(0.1, publish, (events_app, first_id, 'processing'))
+    timer.start()
+    _, frames = read_stream(client, f'/api/v1/orders/{first_id}/events')
+    timer.join()
+    assert [frame['id'] for frame in frames if frame.get('event') == 'status'] == ['1']
+    assert {'': 'heartbeat'} in frames # Idle periods are filled with comments
+
+def test_resume_outside_replay_buffer_asks_for_resync(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, _ = event_order_ids
+    for status in ('a', 'b', 'c', 'd', 'e'):
+        publish(events_app, first_id, status)
+    assert db.session.execute(db.select(OrderEvent.id).order_by(OrderEvent.id)).scalars().all() == [3, 4, 5]
+
+    # The table keeps events 3..5: resuming from 2 is still complete, from 1 is not
+    _, frames = read_stream(client, f'/api/v1/orders/{first_id}/events', headers={'Last-Event-ID': '2'})
+    assert [frame['id'] for frame in frames if frame.get('event') == 'status'] == ['3', '4', '5']
+
+    _, frames = read_stream(client, f'/api/v1/orders/{first_id}/events', headers={'Last-Event-ID': '1'})
+    assert [frame.get('event') for frame in frames if 'event' in frame] == ['resync']
+    assert frames[1]['id'] == '5'
+
+    # An id that was never issued (e.g. from another database) also resyncs
+    _, frames = read_stream(client, f'/api/v1/orders/{first_id}/events', query_string={'last_event_id': 99})
+    assert [frame.get('event') for frame in frames if 'event' in frame] == ['resync']
+
+def test_stream_for_unknown_order(events_app):
+    client = events_app.test_client()
+    response = client.get('/api/v1/orders/9999/events')
+    assert response.status_code == 404
+    assert response.json['message'] == 'Order not found'
+
+def test_rolled_back_event_is_not_streamed(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, _ = event_order_ids
+    order_events.publish(db.session, first_id, {'order_id': first_id, 'status': 'processing'})
+    db.session.rollback()
+
+    _, frames = read_stream(client, '/api/v1/admin/orders/events', headers={'Last-Event-ID': '0'})
+    assert not [frame for frame in frames if frame.get('event') == 'status']
+
+def test_events_are_shared_by_all_workers(make_app, tmp_path):
+    # Two apps on one database file stand in for two server worker processes
+    database_uri = f"sqlite:///{tmp_path / 'events.db'}"
+    worker_a = make_app(SQLALCHEMY_DATABASE_URI=database_uri, **SSE_CONFIG)
+    worker_b = make_app(SQLALCHEMY_DATABASE_URI=database_uri, **SSE_CONFIG)
+    first_id, second_id = seed_event_orders(worker_a)
+    worker_a.test_client().put(f'/api/v1/orders/{first_id}/status', json={'status': 'processing'})
+
+    # Worker b resumes from an id issued by worker a...
+    _, frames = read_stream(worker_b.test_client(), '/api/v1/admin/orders/events', headers={'Last-Event-ID': '0'})
+    assert [frame['id'] for frame in frames if frame.get('event') == 'status'] == ['1']
+
+    # ...and its live subscribers pick up changes committed by worker a
+    def change_status():
+        worker_a.test_client().put(f'/api/v1/orders/{second_id}/status', json={'status': 'processing'})
+
+    timer = threading.Timer(0.1, change_status)
+    timer.start()
+    _, frames = read_stream(worker_b.test_client(), f'/api/v1/orders/{second_id}/events')
+    timer.join()
+    payloads = [json.loads(frame['data']) for frame in frames if frame.get('event') == 'status']
+    assert [(p['order_id'], p['status']) for p in payloads] == [(second_id, 'processing')]
+
+def test_idle_streams_share_one_dispatcher(events_app, event_order_ids, count_statements):
+    first_id, _ = event_order_ids
+    responses = []
+
+    def subscribe():
+        responses.append(read_stream(events_app.test_client(), f'/api/v1/orders/{first_id}/events'))
+
+    threads = [threading.Thread(target=subscribe) for _ in range(8)]
+    with count_statements(events_app) as statements:
+        for thread in threads:
+            thread.start()
+        threading.Timer(0.1, publish, (events_app, first_id, 'processing')).start()
+        for thread in threads:
+            thread.join()
+
+    for _, frames in responses:
+        assert [json.loads(frame['data'])['status'] for frame in frames if frame.get('event') == 'status'] == ['processing']
+    dispatcher_reads = [statement for statement in statements if 'order_event.order_id' in statement]
+    # One read per poll tick for all eight streams (0.3s / 0.05s), not one per stream
+    assert len(dispatcher_reads) <= 0.3 / 0.05 + 3
+
+def test_subscribers_are_released_when_streams_end(events_app, event_order_ids):
+    client = events_app.test_client()
+    first_id, _ = event_order_ids
+    read_stream(client, f'/api/v1/orders/{first_id}/events')
+    read_stream(client, '/api/v1/admin/orders/events')
+    assert events_app.extensions['order_events'].subscribers == {}
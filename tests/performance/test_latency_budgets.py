@@ -0,0 +1,22 @@
+import pytest
+from benchmarks.load_test import BUDGETS_MS, LoadTest, check_budgets, percentile
+
+@pytest.mark.budget
+def test_latency_budgets():
+    # A short smoke run of the load-test suite; use `python -m benchmarks.load_test` for full runs
+    results = LoadTest(concurrency=4, total_requests=200).run()
+
+    assert set(results['endpoints']) == set(BUDGETS_MS)
+    for stats in results['endpoints'].values():
+        assert stats['p50_ms'] <= stats['p95_ms'] <= stats['p99_ms']
+    assert check_budgets(results) == []
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile(values, 0) == 1
+    assert percentile([7], 95) == 7
+    assert percentile([1, 2, 3], 50) == 2
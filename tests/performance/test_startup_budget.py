@@ -0,0 +1,13 @@
+import pytest
+from benchmarks.startup_time import BUDGETS_MS, check_budgets, run
+
+@pytest.mark.budget
+def test_startup_budget():
+    # A single cold start per profile; use `python -m benchmarks.startup_time` for full runs
+    results = run(runs=1)
+
+    runtime, full = results['profiles']['runtime'], results['profiles']['full']
+    assert not runtime['alembic_loaded']
+    assert full['alembic_loaded']
+    assert set(runtime) == {f'{phase}_ms' for phase in BUDGETS_MS} | {'alembic_loaded'}
+    assert check_budgets(results) == []
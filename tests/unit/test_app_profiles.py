@@ -0,0 +1,17 @@
+import pytest
+
+def test_full_profile_registers_migrations(make_app):
+    app = make_app(APP_PROFILE='full')
+    assert 'migrate' in app.extensions
+    assert 'db' in app.cli.commands
+
+def test_runtime_profile_skips_migrations(make_app):
+    app = make_app(APP_PROFILE='runtime')
+    assert 'migrate' not in app.extensions
+    assert 'db' not in app.cli.commands
+    # Everything needed to serve requests is still there
+    assert app.test_client().get('/metrics').status_code == 200
+
+def test_unknown_profile(make_app):
+    with pytest.raises(ValueError, match='Unknown APP_PROFILE'):
+        make_app(APP_PROFILE='lean')
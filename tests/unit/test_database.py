@@ -0,0 +1,65 @@
+import pytest
+from app import create_app, db
+from app.database import reset_engine_after_fork
+
+def test_production_profile_applies_pragmas(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'prod.db'}",
+        "DB_ENGINE_PROFILE": "production",
+        "SQLITE_BUSY_TIMEOUT_MS": 2500,
+    })
+    with app.app_context():
+        with db.engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1 # NORMAL
+            assert pragma('busy_timeout') == 2500
+            assert pragma('cache_size') == -64 * 1024
+            assert pragma('mmap_size') == 256 * 1024 * 1024
+        assert db.engine.pool.size() == 16
+        db.engine.dispose()
+
+def test_default_profile_keeps_sqlite_defaults(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'dev.db'}",
+    })
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'delete'
+        db.engine.dispose()
+
+def test_settings_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('BREAKFAST_SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'env.db'}")
+    monkeypatch.setenv('BREAKFAST_DB_ENGINE_PROFILE', 'production')
+    monkeypatch.setenv('BREAKFAST_SQLITE_MMAP_SIZE', '0')
+    app = create_app({"TESTING": True})
+    assert app.config['SQLALCHEMY_DATABASE_URI'].endswith('env.db')
+    assert app.config['SQLITE_MMAP_SIZE'] == 0
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA mmap_size').scalar() == 0
+        db.engine.dispose()
+
+def test_unknown_profile_rejected():
+    with pytest.raises(ValueError, match="Unknown DB_ENGINE_PROFILE 'turbo'"):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "DB_ENGINE_PROFILE": "turbo"})
+
+def test_reset_engine_after_fork_leaves_parent_connections_open(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'fork.db'}",
+    })
+    with app.app_context():
+        inherited = db.engine.connect()
+        parent_pool = db.engine.pool
+        reset_engine_after_fork(app)
+        assert db.engine.pool is not parent_pool
+        # The worker opens fresh connections; the inherited one is not closed under the parent
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('SELECT 1').scalar() == 1
+        assert inherited.exec_driver_sql('SELECT 1').scalar() == 1
+        inherited.close()
+        db.engine.dispose()
@@ -0,0 +1,105 @@
+import pytest
+from app import db, low_stock_monitor
+from app.models import User, MenuItem
+from app.services import OrderService
+
+def seed_alert_data(app):
+    with app.app_context():
+        user = User(username='alert_user', email='alert@example.com', password_hash='x')
+        coffee = MenuItem(name='Coffee', price=2.50, stock=12)
+        bagel = MenuItem(name='Bagel', price=3.00, stock=30, low_stock_threshold=25)
+        db.session.add_all([user, coffee, bagel])
+        db.session.commit()
+        return user.id, coffee.id, bagel.id
+
+@pytest.fixture
+def alerts_app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def alert_data(alerts_app):
+    return seed_alert_data(alerts_app)
+
+def order(user_id, item_id, quantity):
+    OrderService.create_order(user_id, [{'item_id': item_id, 'quantity': quantity}])
+
+def test_alert_raised_once_when_crossing_threshold(alerts_app, alert_data):
+    user_id, coffee_id, bagel_id = alert_data
+    order(user_id, coffee_id, 2) # 12 -> 10: not below 10 yet
+    assert low_stock_monitor.recent() == []
+
+    order(user_id, coffee_id, 1) # 10 -> 9: crosses
+    order(user_id, coffee_id, 1) # 9 -> 8: still below, no new alert
+    alerts = low_stock_monitor.recent()
+    assert len(alerts) == 1
+    assert alerts[0]['menu_item_id'] == coffee_id
+    assert alerts[0]['stock'] == 9
+    assert alerts[0]['threshold'] == 10
+
+def test_per_item_threshold(alerts_app, alert_data):
+    user_id, coffee_id, bagel_id = alert_data
+    order(user_id, bagel_id, 6) # 30 -> 24 crosses the item's own threshold of 25
+    alerts = low_stock_monitor.recent()
+    assert [(alert['menu_item_id'], alert['threshold']) for alert in alerts] == [(bagel_id, 25)]
+
+def test_restock_rearms_alert(alerts_app, alert_data):
+    user_id, coffee_id, bagel_id = alert_data
+    order(user_id, coffee_id, 5) # 12 -> 7
+    coffee = db.session.get(MenuItem, coffee_id)
+    coffee.stock = 20
+    db.session.commit()
+    order(user_id, coffee_id, 15) # 20 -> 5 crosses again
+    alerts = low_stock_monitor.recent()
+    assert [alert['stock'] for alert in alerts] == [5, 7] # Newest first
+
+def test_rejected_order_raises_no_alert(alerts_app, alert_data):
+    user_id, coffee_id, bagel_id = alert_data
+    with pytest.raises(ValueError):
+        OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 5}, {'item_id': 999, 'quantity': 1}])
+    assert low_stock_monitor.recent() == []
+
+def test_alerts_endpoint(alerts_app, alert_data):
+    user_id, coffee_id, bagel_id = alert_data
+    order(user_id, coffee_id, 3)
+    order(user_id, bagel_id, 10)
+    response = alerts_app.test_client().get('/api/v1/admin/alerts?limit=1')
+    assert response.status_code == 200
+    alerts = response.get_json()['alerts']
+    assert len(alerts) == 1
+    assert alerts[0]['name'] == 'Bagel'
+    assert 'Please restock' in alerts[0]['message']
+
+def test_alerts_are_shared_by_all_workers(make_app, tmp_path):
+    # Two apps on one database file stand in for two gunicorn worker processes
+    database_uri = f"sqlite:///{tmp_path / 'alerts.db'}"
+    worker_a = make_app(SQLALCHEMY_DATABASE_URI=database_uri)
+    worker_b = make_app(SQLALCHEMY_DATABASE_URI=database_uri)
+    user_id, coffee_id, _ = seed_alert_data(worker_a)
+    payload = lambda quantity: {'user_id': user_id, 'items': [{'item_id': coffee_id, 'quantity': quantity}]}
+
+    assert worker_a.test_client().post('/api/v1/orders', json=payload(3)).status_code == 201 # 12 -> 9: crosses
+    assert worker_b.test_client().post('/api/v1/orders', json=payload(1)).status_code == 201 # 9 -> 8: no new alert
+
+    for worker in (worker_a, worker_b):
+        alerts = worker.test_client().get('/api/v1/admin/alerts').get_json()['alerts']
+        assert [(alert['menu_item_id'], alert['stock']) for alert in alerts] == [(coffee_id, 9)]
+
+def test_committed_alerts_are_forwarded_to_sink(make_app):
+    class RecordingSink:
+        def __init__(self):
+            self.alerts = []
+
+        def emit(self, alert):
+            self.alerts.append(alert)
+
+    sink = RecordingSink()
+    app = make_app(LOW_STOCK_ALERT_SINK=sink)
+    user_id, coffee_id, _ = seed_alert_data(app)
+    with app.app_context():
+        with pytest.raises(ValueError):
+            OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 5}, {'item_id': 999, 'quantity': 1}])
+        order(user_id, coffee_id, 5)
+        assert [alert['stock'] for alert in sink.alerts] == [7]
+        assert sink.alerts[0]['id'] == low_stock_monitor.recent()[0]['id']
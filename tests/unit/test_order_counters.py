@@ -0,0 +1,82 @@
+import pytest
+from app import db, order_counters
+from app.models import User, MenuItem, Order
+from app.services import OrderService
+
+@pytest.fixture
+def counters_app(make_app):
+    # A fresh database per test, so the counters only see the orders placed by that test
+    app = make_app(ORDER_COUNTERS_CACHE_SECONDS=60)
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def seed_counter_data(counters_app):
+    user = User(username='counter_user', email='counter@example.com', password_hash='x')
+    coffee = MenuItem(name='Coffee', price=2.50, stock=10)
+    db.session.add_all([user, coffee])
+    db.session.commit()
+    return user.id, coffee.id
+
+def test_counters_follow_orders_and_transitions(counters_app, seed_counter_data):
+    user_id, coffee_id = seed_counter_data
+    first, _ = OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}])
+    second, _ = OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}])
+    OrderService.create_orders_bulk([
+        {'user_id': user_id, 'items': [{'item_id': coffee_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': coffee_id, 'quantity': 100}]}, # Rejected
+    ])
+    assert order_counters.counts() == {'pending': 3, 'processing': 0, 'ready_for_delivery': 0, 'completed': 0, 'cancelled': 0}
+
+    OrderService.change_status(first.id, 'processing')
+    OrderService.cancel_order(second.id)
+    assert order_counters.counts()['pending'] == 1
+    assert order_counters.counts()['processing'] == 1
+    assert order_counters.counts()['cancelled'] == 1
+    # Refused transitions change nothing
+    assert OrderService.change_status(second.id, 'processing') is None
+    assert order_counters.counts()['cancelled'] == 1
+    assert order_counters.check() == {}
+
+def test_rolled_back_orders_are_not_counted(counters_app, seed_counter_data):
+    user_id, coffee_id = seed_counter_data
+    with pytest.raises(ValueError):
+        OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 11}])
+    order_counters.record(db.session, {'pending': 5})
+    db.session.rollback()
+    assert order_counters.counts()['pending'] == 0
+
+def test_dashboard_endpoint_is_cached_and_never_counts_orders(counters_app, seed_counter_data, count_statements):
+    user_id, coffee_id = seed_counter_data
+    client = counters_app.test_client()
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}])
+
+    with count_statements(counters_app) as statements:
+        first = client.get('/api/v1/admin/dashboard')
+        cached = client.get('/api/v1/admin/dashboard')
+    assert first.status_code == 200
+    assert first.get_json()['order_counts']['pending'] == 1
+    assert first.get_json()['total_orders'] == 1
+    assert cached.get_json() == first.get_json()
+    assert len(statements) == 1 # The second request is served from the cache
+    assert 'FROM order_status_count' in statements[0]
+
+    # A local commit invalidates the cache straight away
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}])
+    assert client.get('/api/v1/admin/dashboard').get_json()['total_orders'] == 2
+
+def test_check_detects_drift_and_rebuild_repairs_it(counters_app, seed_counter_data):
+    user_id, coffee_id = seed_counter_data
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}])
+    # An order written behind the service's back
+    db.session.add(Order(user_id=user_id, status='completed'))
+    db.session.commit()
+    assert order_counters.check() == {'completed': (0, 1)}
+
+    runner = counters_app.test_cli_runner()
+    assert runner.invoke(args=['order-counters', 'check']).exit_code != 0
+    assert runner.invoke(args=['order-counters', 'rebuild']).exit_code == 0
+    result = runner.invoke(args=['order-counters', 'check'])
+    assert result.exit_code == 0
+    assert 'match' in result.output
+    assert order_counters.counts()['completed'] == 1
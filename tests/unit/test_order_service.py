@@ -1,6 +1,6 @@
 import pytest
 from app.models import User, MenuItem, Order, OrderItem
-from app.services import OrderService
+from app.services import OrderService, InsufficientStockError, OrderValidationError
 from app import db
 
 @pytest.fixture
@@ -95,6 +95,8 @@ def test_create_order_success(app, seed_data):
         assert order.user_id == user_obj.id
         assert order.status == 'pending'
         assert total_amount == 10.00
+        assert order.total_amount == 10.00
+        assert order.item_count == 3
 
         # Check order items
         order_items = OrderItem.query.filter_by(order_id=order.id).all()
@@ -140,3 +142,149 @@ def test_create_order_item_not_found(app, seed_data):
         assert Order.query.count() == 0
         db.session.refresh(item1)
         assert item1.stock == 10 # Initial stock
+
+def test_load_menu_items_single_query(app, seed_data, count_statements):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        with count_statements(app) as statements:
+            menu_items = OrderService.load_menu_items([item1_id, item2_id, 999])
+
+        assert len(statements) == 1
+        assert set(menu_items) == {item1_id, item2_id}
+
+def test_create_order_loads_menu_items_once(app, seed_data, count_statements):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        items_data = [
+            {'item_id': item1_id, 'quantity': 1},
+            {'item_id': item2_id, 'quantity': 1},
+            {'item_id': item1_id, 'quantity': 2}
+        ]
+        with count_statements(app) as statements:
+            order, total_amount = OrderService.create_order(user_obj.id, items_data)
+
+        assert len([statement for statement in statements if statement.startswith('SELECT') and 'FROM menu_item' in statement]) == 1
+        assert total_amount == 3 * 2.50 + 5.00
+        assert db.session.get(MenuItem, item1_id).stock == 7
+        # Duplicate lines are merged into one order item
+        assert sorted((item.menu_item_id, item.quantity) for item in order.items) == [(item1_id, 3), (item2_id, 1)]
+
+def test_validate_order_coalesces_duplicate_lines(app):
+    with app.app_context():
+        items_data = [
+            {'item_id': 2, 'quantity': 1},
+            {'item_id': 1, 'quantity': 1},
+            {'item_id': 2, 'quantity': 3}
+        ]
+        assert OrderService.validate_order(1, items_data) == [
+            {'item_id': 2, 'quantity': 4},
+            {'item_id': 1, 'quantity': 1}
+        ]
+
+@pytest.mark.parametrize('user_id, items_data, message', [
+    (None, [{'item_id': 1, 'quantity': 1}], 'User ID is required'),
+    ('1', [{'item_id': 1, 'quantity': 1}], 'User ID must be a positive integer'),
+    (1, [], 'Items data (list of item_id and quantity) is required'),
+    (1, {'item_id': 1, 'quantity': 1}, 'Items data (list of item_id and quantity) is required'),
+    (1, [{'item_id': 1, 'quantity': 1}] * 4, 'An order may contain at most 3 lines'),
+    (1, ['1'], 'Each item requires an item_id and a quantity'),
+    (1, [{'item_id': 1}], 'Each item requires an item_id and a quantity'),
+    (1, [{'item_id': True, 'quantity': 1}], 'Invalid item_id True'),
+    (1, [{'item_id': -1, 'quantity': 1}], 'Invalid item_id -1'),
+    (1, [{'item_id': 1, 'quantity': 0}], 'Invalid quantity for item 1'),
+    (1, [{'item_id': 1, 'quantity': 1.5}], 'Invalid quantity for item 1'),
+    (1, [{'item_id': 1, 'quantity': 11}], 'Invalid quantity for item 1'),
+    (1, [{'item_id': 1, 'quantity': 6}, {'item_id': 1, 'quantity': 6}], 'Total quantity for item 1 may not exceed 10'),
+])
+def test_validate_order_rejects_malformed_requests(app, user_id, items_data, message):
+    with app.app_context():
+        with pytest.raises(OrderValidationError) as exc_info:
+            OrderService.validate_order(user_id, items_data, max_lines=3, max_quantity=10)
+        assert message in str(exc_info.value)
+
+def test_reserve_stock_reports_failed_items(app, seed_data):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        failed_items = OrderService.reserve_stock({item1_id: 4, item2_id: 6, item3_id: 1})
+        assert failed_items == {item2_id: 6, item3_id: 1}
+        db.session.rollback()
+        assert db.session.get(MenuItem, item1_id).stock == 10
+
+def test_create_order_reservation_conflict(app, seed_data, monkeypatch):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        # Simulate another worker draining stock between the check and the reservation
+        monkeypatch.setattr(OrderService, 'check_stock', staticmethod(lambda item_id, quantity, menu_items=None: (True, None)))
+        items_data = [
+            {'item_id': item1_id, 'quantity': 1},
+            {'item_id': item2_id, 'quantity': 6}
+        ]
+        with pytest.raises(InsufficientStockError, match="Not enough stock for Sandwich") as excinfo:
+            OrderService.create_order(user_obj.id, items_data)
+
+        assert excinfo.value.failed_items == {item2_id: 6}
+        assert Order.query.count() == 0
+        assert db.session.get(MenuItem, item1_id).stock == 10
+
+def test_cancel_order_restores_stock_once(app, seed_data):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        order, _ = OrderService.create_order(user_obj.id, [
+            {'item_id': item1_id, 'quantity': 3},
+            {'item_id': item2_id, 'quantity': 1},
+            {'item_id': item1_id, 'quantity': 2}
+        ])
+        assert db.session.get(MenuItem, item1_id).stock == 5
+
+        assert OrderService.cancel_order(order.id, 'pending') is True
+        assert db.session.get(Order, order.id).status == 'cancelled'
+        assert db.session.get(MenuItem, item1_id).stock == 10
+        assert db.session.get(MenuItem, item2_id).stock == 5
+
+        # A second (late) cancellation no longer matches and must not restore again
+        assert OrderService.cancel_order(order.id, 'pending') is False
+        assert db.session.get(MenuItem, item1_id).stock == 10
+
+def test_change_status_follows_state_machine(app, seed_data):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        order, _ = OrderService.create_order(user_obj.id, [{'item_id': item1_id, 'quantity': 1}])
+
+        assert OrderService.change_status(order.id, 'ready_for_delivery') is None # Must be processing first
+        changed = OrderService.change_status(order.id, 'processing')
+        assert (changed.user_id, changed.previous_status) == (user_obj.id, 'pending')
+        changed = OrderService.change_status(order.id, 'ready_for_delivery')
+        assert changed.previous_status == 'processing'
+        assert OrderService.change_status(order.id, 'pending') is None
+        assert OrderService.change_status(order.id, 'completed').previous_status == 'ready_for_delivery'
+        assert OrderService.change_status(order.id, 'cancelled') is None
+
+        order = db.session.get(Order, order.id)
+        assert (order.status, order.previous_status) == ('completed', 'ready_for_delivery')
+        assert db.session.get(MenuItem, item1_id).stock == 9
+
+def test_change_status_is_one_conditional_update(app, seed_data, count_statements):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        order, _ = OrderService.create_order(user_obj.id, [{'item_id': item1_id, 'quantity': 1}])
+        order_id = order.id
+        with count_statements(app) as statements:
+            OrderService.change_status(order_id, 'processing')
+            # A stale writer that still expects 'pending' matches nothing
+            assert OrderService.change_status(order_id, 'cancelled', expected_status='pending') is None
+
+        statements = [statement for statement in statements if 'order_item' not in statement and '"order"' in statement]
+        assert len(statements) == 2
+        assert all(statement.startswith('UPDATE "order"') for statement in statements)
+        assert db.session.get(Order, order_id).status == 'processing'
+
+def test_restore_stock_is_one_executemany(app, seed_data, count_statements):
+    user_obj, item1_id, item2_id, item3_id = seed_data
+    with app.app_context():
+        with count_statements(app) as statements:
+            OrderService.restore_stock({item1_id: 1, item2_id: 2, item3_id: 3})
+        db.session.commit()
+
+        # Three items, one round trip
+        assert len([statement for statement in statements if statement.startswith('UPDATE menu_item')]) == 1
+        assert db.session.get(MenuItem, item3_id).stock == 3
@@ -0,0 +1,79 @@
+import threading
+import pytest
+from app import db, password_hasher, passwords
+from app.models import User
+from app.passwords import PasswordHashingBusy
+
+FAST_METHOD = 'pbkdf2:sha256:1000' # Cheap work factor to keep the tests fast
+
+def test_hash_and_verify_use_configured_method(make_app):
+    app = make_app(PASSWORD_HASH_METHOD=FAST_METHOD)
+    with app.app_context():
+        password_hash = password_hasher.hash('secret')
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert password_hasher.verify(password_hash, 'secret') == (True, None)
+        assert password_hasher.verify(password_hash, 'wrong') == (False, None)
+        assert not password_hasher.needs_rehash(password_hash)
+
+def test_bcrypt_method(make_app):
+    pytest.importorskip('bcrypt')
+    app = make_app(PASSWORD_HASH_METHOD='bcrypt:4')
+    with app.app_context():
+        password_hash = password_hasher.hash('secret')
+        assert password_hash.startswith('$2b$04$')
+        assert password_hasher.verify(password_hash, 'secret') == (True, None)
+        assert password_hasher.verify(password_hash, 'wrong') == (False, None)
+
+def test_old_hashes_are_upgraded_on_login(make_app):
+    old_app = make_app(PASSWORD_HASH_METHOD='pbkdf2:sha256:500')
+    with old_app.app_context():
+        old_hash = password_hasher.hash('secret')
+
+    app = make_app(PASSWORD_HASH_METHOD=FAST_METHOD)
+    with app.app_context():
+        user = User(username='legacy', email='legacy@example.com', password_hash=old_hash)
+        db.session.add(user)
+        db.session.commit()
+        assert password_hasher.needs_rehash(old_hash)
+
+        assert not user.check_password('wrong')
+        assert user.password_hash == old_hash # Never re-hashed on a failed login
+
+        assert user.check_password('secret')
+        db.session.commit()
+        db.session.expire_all()
+        upgraded = db.session.get(User, user.id).password_hash
+        assert upgraded.startswith('pbkdf2:sha256:1000$')
+        assert db.session.get(User, user.id).check_password('secret')
+
+def test_burst_beyond_pending_limit_fails_fast(make_app, monkeypatch):
+    app = make_app(PASSWORD_HASH_METHOD=FAST_METHOD, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1, PASSWORD_HASH_WAIT_SECONDS=0.05)
+    release = threading.Event()
+    started = threading.Event()
+    real_hash = passwords._hash
+
+    def slow_hash(password, method):
+        started.set()
+        release.wait(5)
+        return real_hash(password, method)
+
+    monkeypatch.setattr(passwords, '_hash', slow_hash)
+    results = []
+
+    def hash_in_background():
+        with app.app_context():
+            results.append(password_hasher.hash('first'))
+
+    worker = threading.Thread(target=hash_in_background)
+    worker.start()
+    assert started.wait(5)
+    with app.app_context():
+        with pytest.raises(PasswordHashingBusy):
+            password_hasher.hash('second')
+    release.set()
+    worker.join()
+    assert len(results) == 1
+
+    # The slot is released once the job finishes
+    with app.app_context():
+        assert password_hasher.verify(results[0], 'first') == (True, None)
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+import pytest
+from flask import Flask
+from app import db, order_counters, sales_rollups
+from app.models import User, MenuItem, Order, DailySales, HourlySales, MenuItemDailySales, DailyOrderStatus
+from app.services import OrderService
+
+@pytest.fixture
+def rollups_app(make_app):
+    # A fresh database per test, so rollups only see the orders placed by that test
+    app = make_app()
+    with app.app_context():
+        yield app
+
+@pytest.fixture
+def seed_rollup_data(rollups_app):
+    user = User(username='report_user', email='report@example.com', password_hash='x')
+    coffee = MenuItem(name='Coffee', price=2.50, stock=100)
+    bagel = MenuItem(name='Bagel', price=3.00, stock=100)
+    db.session.add_all([user, coffee, bagel])
+    db.session.commit()
+    return user.id, coffee.id, bagel.id
+
+def today_report(**kwargs):
+    today = datetime.utcnow().date()
+    return sales_rollups.report(today, today, **kwargs)
+
+def test_order_creation_updates_rollups(rollups_app, seed_rollup_data):
+    user_id, coffee_id, bagel_id = seed_rollup_data
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 2}, {'item_id': bagel_id, 'quantity': 1}])
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}, {'item_id': coffee_id, 'quantity': 3}])
+
+    report = today_report()
+    assert report['totals'] == {'orders': 2, 'items': 7, 'revenue': 2 * 2.50 + 3.00 + 4 * 2.50}
+    assert report['status_counts'] == {'pending': 2}
+    assert [(item['name'], item['quantity'], item['revenue']) for item in report['top_items']] == [
+        ('Coffee', 6, 15.00), ('Bagel', 1, 3.00)
+    ]
+    hourly = today_report(granularity='hour')
+    assert hourly['totals'] == report['totals']
+    assert len(hourly['series']) == 1
+    assert sales_rollups.check() == []
+
+def test_status_changes_and_cancellation(rollups_app, seed_rollup_data):
+    user_id, coffee_id, bagel_id = seed_rollup_data
+    client = rollups_app.test_client()
+    first, _ = OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 2}])
+    second, _ = OrderService.create_order(user_id, [{'item_id': bagel_id, 'quantity': 1}])
+
+    client.put(f'/api/v1/orders/{first.id}/status', json={'status': 'processing'})
+    client.put(f'/api/v1/orders/{second.id}/status', json={'status': 'cancelled'})
+
+    report = today_report()
+    assert report['status_counts'] == {'processing': 1, 'cancelled': 1}
+    # Cancelled orders leave the sales figures
+    assert report['totals'] == {'orders': 1, 'items': 2, 'revenue': 5.00}
+    assert [item['name'] for item in report['top_items']] == ['Coffee']
+    assert sales_rollups.check() == []
+
+def test_bulk_orders_update_rollups(rollups_app, seed_rollup_data):
+    user_id, coffee_id, bagel_id = seed_rollup_data
+    OrderService.create_orders_bulk([
+        {'user_id': user_id, 'items': [{'item_id': coffee_id, 'quantity': 1}]},
+        {'user_id': user_id, 'items': [{'item_id': bagel_id, 'quantity': 2}]},
+        {'user_id': user_id, 'items': [{'item_id': bagel_id, 'quantity': 1000}]}, # Rejected
+    ])
+    assert today_report()['totals'] == {'orders': 2, 'items': 3, 'revenue': 2.50 + 6.00}
+    assert sales_rollups.check() == []
+
+def test_report_reads_only_rollups(rollups_app, seed_rollup_data, count_statements):
+    user_id, coffee_id, _ = seed_rollup_data
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 1}])
+    with count_statements(rollups_app) as statements:
+        today_report()
+    assert statements
+    assert not [statement for statement in statements if 'order_item' in statement or 'FROM "order"' in statement]
+
+def test_check_detects_drift_and_rebuild_repairs_it(rollups_app, seed_rollup_data):
+    user_id, coffee_id, _ = seed_rollup_data
+    order, _ = OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 2}])
+    # An order written behind the service's back, a day earlier
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    db.session.add(Order(user_id=user_id, status='completed', created_at=yesterday))
+    db.session.commit()
+
+    mismatches = sales_rollups.check()
+    assert {mismatch['table'] for mismatch in mismatches} == {'daily_sales', 'hourly_sales', 'daily_order_status'}
+
+    runner = rollups_app.test_cli_runner()
+    result = runner.invoke(args=['sales-rollups', 'check'])
+    assert result.exit_code != 0
+    result = runner.invoke(args=['sales-rollups', 'rebuild'])
+    assert result.exit_code == 0
+    result = runner.invoke(args=['sales-rollups', 'check'])
+    assert result.exit_code == 0
+    assert 'match' in result.output
+
+    today = datetime.utcnow().date()
+    report = sales_rollups.report(yesterday.date(), today)
+    assert report['totals']['orders'] == 2
+    assert report['status_counts'] == {'pending': 1, 'completed': 1}
+    assert db.session.get(DailySales, today).revenue == 5.00
+    assert MenuItemDailySales.query.count() == 1
+    assert HourlySales.query.count() >= 1
+    assert DailyOrderStatus.query.count() == 2
+
+def test_sales_report_endpoint(rollups_app, seed_rollup_data):
+    user_id, coffee_id, _ = seed_rollup_data
+    OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 3}])
+    client = rollups_app.test_client()
+
+    response = client.get('/api/v1/admin/reports/sales')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['granularity'] == 'day'
+    assert data['totals'] == {'orders': 1, 'items': 3, 'revenue': 7.50}
+    assert data['series'][0]['period'] == datetime.utcnow().date().isoformat()
+
+    response = client.get('/api/v1/admin/reports/sales?start_date=2000-01-01&end_date=2000-01-31')
+    assert response.get_json()['totals'] == {'orders': 0, 'items': 0, 'revenue': 0}
+
+    assert client.get('/api/v1/admin/reports/sales?start_date=01-01-2000').status_code == 400
+    assert client.get('/api/v1/admin/reports/sales?start_date=2000-02-01&end_date=2000-01-01').status_code == 400
+    assert client.get('/api/v1/admin/reports/sales?granularity=week').status_code == 400
+
+def test_unsupported_database_is_rejected_at_startup():
+    # Checked when the extensions are set up, not at the first order
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql://breakfast@localhost/breakfast'
+    with pytest.raises(ValueError, match="Sales rollups need INSERT ... ON CONFLICT, which the 'mysql' database"):
+        sales_rollups.init_app(app)
+    with pytest.raises(ValueError, match="Order status counters need INSERT"):
+        order_counters.init_app(app)
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db, stock_ledger
+from app.models import User, MenuItem, Order, OrderItem, StockMovement
+from app.services import OrderService
+
+@pytest.fixture
+def ledger_data(app):
+    with app.app_context():
+        db.session.query(StockMovement).delete()
+        db.session.query(OrderItem).delete()
+        db.session.query(Order).delete()
+        db.session.query(MenuItem).delete()
+        db.session.query(User).delete()
+        db.session.commit()
+        stock_ledger.flush()
+        db.session.query(StockMovement).delete()
+        db.session.commit()
+
+        user = User(username='ledger_user', email='ledger@example.com')
+        user.set_password('password')
+        coffee = MenuItem(name='Coffee', price=2.50, stock=10)
+        bagel = MenuItem(name='Bagel', price=3.00, stock=4)
+        db.session.add_all([user, coffee, bagel])
+        db.session.commit()
+        return user.id, coffee.id, bagel.id
+
+def test_movements_are_buffered_until_flush(app, ledger_data):
+    user_id, coffee_id, bagel_id = ledger_data
+    with app.app_context():
+        order, _ = OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 2}, {'item_id': coffee_id, 'quantity': 1}])
+        # Nothing has been written yet: the order only appended to the buffer
+        assert StockMovement.query.count() == 0
+
+        assert stock_ledger.flush() == 3
+        movements = StockMovement.query.filter_by(reason='order').all()
+        assert [(m.menu_item_id, m.delta, m.order_id) for m in movements] == [(coffee_id, -3, order.id)]
+
+def test_failed_order_is_not_ledgered(app, ledger_data):
+    user_id, coffee_id, bagel_id = ledger_data
+    with app.app_context():
+        stock_ledger.flush()
+        with pytest.raises(ValueError):
+            OrderService.create_order(user_id, [{'item_id': bagel_id, 'quantity': 5}])
+        assert stock_ledger.flush() == 0
+
+def test_failed_flush_keeps_movements(app, ledger_data, monkeypatch):
+    user_id, coffee_id, bagel_id = ledger_data
+    with app.app_context():
+        stock_ledger.flush()
+        OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 2}])
+        state = app.extensions['stock_ledger']
+        real_engine = state.engine
+
+        class LockedEngine:
+            def begin(self):
+                raise OperationalError('INSERT INTO stock_movement', {}, Exception('database is locked'))
+        monkeypatch.setattr(state, 'engine', LockedEngine())
+        with pytest.raises(OperationalError):
+            stock_ledger.flush()
+        assert StockMovement.query.filter_by(reason='order').count() == 0
+
+        monkeypatch.setattr(state, 'engine', real_engine)
+        assert stock_ledger.flush() == 1
+        assert [(m.menu_item_id, m.delta) for m in StockMovement.query.filter_by(reason='order')] == [(coffee_id, -2)]
+
+def test_rebuild_and_reconcile(app, ledger_data):
+    user_id, coffee_id, bagel_id = ledger_data
+    with app.app_context():
+        OrderService.create_order(user_id, [{'item_id': coffee_id, 'quantity': 4}, {'item_id': bagel_id, 'quantity': 1}])
+        OrderService.create_orders_bulk([{'user_id': user_id, 'items': [{'item_id': bagel_id, 'quantity': 2}]}])
+        bagel = db.session.get(MenuItem, bagel_id)
+        bagel.stock += 5 # Restock through the ORM is ledgered as an adjustment
+        db.session.commit()
+
+        assert stock_ledger.rebuild_stock() == {coffee_id: 6, bagel_id: 6}
+        assert stock_ledger.reconcile() == []
+
+        # A write that bypasses the ledger shows up as drift
+        db.session.execute(db.update(MenuItem).where(MenuItem.id == coffee_id).values(stock=99))
+        db.session.commit()
+        assert stock_ledger.reconcile() == [{'menu_item_id': coffee_id, 'name': 'Coffee', 'stock': 99, 'ledger_stock': 6}]
+
+def test_check_command(app, runner, ledger_data):
+    result = runner.invoke(args=['stock-ledger', 'check'])
+    assert result.exit_code == 0
+    assert 'Stock matches the ledger.' in result.output
@@ -0,0 +1,12 @@
+"""Production WSGI entry point: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+The app is created at import time; with ``preload_app`` that happens once in
+the gunicorn master, before the workers are forked.
+"""
+import os
+from app import create_app
+
+# Production servers use the tuned SQLite profile unless told otherwise
+os.environ.setdefault('BREAKFAST_DB_ENGINE_PROFILE', 'production')
+
+app = create_app()